@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import argparse
+import fnmatch
+import socketserver
+import sys
+import threading
+import time
+
+
+class _Status(bytes):
+    """
+    simple string reply, such as +OK
+    """
+
+
+class _Error(str):
+    """
+    error reply
+    """
+
+
+OK = _Status(b"OK")
+PONG = _Status(b"PONG")
+
+
+def encode_reply(reply):
+    """
+    RESP2 form of a reply
+    """
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, _Status):
+        return b"+" + reply + b"\r\n"
+    if isinstance(reply, _Error):
+        return b"-ERR " + reply.encode("utf8") + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, list):
+        return b"*%d\r\n" % len(reply) + b"".join([encode_reply(item) for item in reply])
+    raise TypeError(f"unknown reply type {type(reply)}")
+
+
+class _Store(object):
+    """
+    keys of all the databases, a key expires when it is read after its deadline
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (value, deadline or None)
+
+    def _get(self, key, now):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            del self.data[key]
+            return None
+        return item[0]
+
+    def get(self, keys):
+        now = time.monotonic()
+        with self.lock:
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key, value, ttl=None, nx=False, xx=False):
+        now = time.monotonic()
+        with self.lock:
+            exists = self._get(key, now) is not None
+            if (nx and exists) or (xx and not exists):
+                return False
+            self.data[key] = (value, now + ttl if ttl is not None else None)
+            return True
+
+    def delete(self, keys):
+        now = time.monotonic()
+        with self.lock:
+            count = 0
+            for key in keys:
+                if self._get(key, now) is not None:
+                    del self.data[key]
+                    count += 1
+            return count
+
+    def increase(self, key, amount):
+        now = time.monotonic()
+        with self.lock:
+            value = self._get(key, now)
+            deadline = self.data[key][1] if value is not None else None
+            value = int(value or 0) + amount
+            self.data[key] = (str(value).encode("ascii"), deadline)
+            return value
+
+    def expire(self, key, ttl):
+        now = time.monotonic()
+        with self.lock:
+            value = self._get(key, now)
+            if value is None:
+                return 0
+            self.data[key] = (value, now + ttl)
+            return 1
+
+    def keys(self, pattern):
+        now = time.monotonic()
+        with self.lock:
+            keys = [key for key in list(self.data.keys()) if self._get(key, now) is not None]
+        pattern = pattern.decode("utf8", "replace")
+        return [key for key in keys if fnmatch.fnmatchcase(key.decode("utf8", "replace"), pattern)]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def _set(store, args):
+    key, value, ttl, nx, xx = args[0], args[1], None, False, False
+    options = [arg.upper() for arg in args[2:]]
+    i = 0
+    while i < len(options):
+        if options[i] == b"EX":
+            ttl = int(args[2 + i + 1])
+            i += 1
+        elif options[i] == b"PX":
+            ttl = int(args[2 + i + 1]) / 1000
+            i += 1
+        elif options[i] == b"NX":
+            nx = True
+        elif options[i] == b"XX":
+            xx = True
+        else:
+            return _Error("syntax error")
+        i += 1
+    return OK if store.set(key, value, ttl, nx, xx) else None
+
+
+def _mset(store, args):
+    for i in range(0, len(args) - 1, 2):
+        store.set(args[i], args[i + 1])
+    return OK
+
+
+def _flush(store, args):
+    store.clear()
+    return OK
+
+
+# command -> (least number of args, handler(store, args))
+_COMMANDS = {
+    b"PING": (0, lambda store, args: args[0] if args else PONG),
+    b"ECHO": (1, lambda store, args: args[0]),
+    b"SELECT": (1, lambda store, args: OK),
+    b"CLIENT": (0, lambda store, args: OK),
+    b"GET": (1, lambda store, args: store.get(args[:1])[0]),
+    b"MGET": (1, lambda store, args: store.get(args)),
+    b"SET": (2, _set),
+    b"MSET": (2, _mset),
+    b"DEL": (1, lambda store, args: store.delete(args)),
+    b"EXISTS": (1, lambda store, args: sum([value is not None for value in store.get(args)])),
+    b"INCR": (1, lambda store, args: store.increase(args[0], 1)),
+    b"INCRBY": (2, lambda store, args: store.increase(args[0], int(args[1]))),
+    b"EXPIRE": (2, lambda store, args: store.expire(args[0], int(args[1]))),
+    b"KEYS": (1, lambda store, args: store.keys(args[0])),
+    b"FLUSHALL": (0, _flush),
+    b"FLUSHDB": (0, _flush),
+}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+
+        if not line.startswith(b"*"):  # inline command
+            return line.split()
+
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                command = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            if not command:
+                continue
+
+            name = command[0].upper()
+            entry = _COMMANDS.get(name)
+            if entry is None:
+                reply = _Error(f"unknown command '{name.decode('utf8', 'replace')}'")
+            elif len(command) - 1 < entry[0]:
+                reply = _Error(f"wrong number of arguments for '{name.decode('utf8', 'replace')}' command")
+            else:
+                try:
+                    reply = entry[1](store, command[1:])
+                except ValueError:
+                    reply = _Error("value is not an integer or out of range")
+
+            try:
+                self.wfile.write(encode_reply(reply))
+            except ConnectionError:
+                return
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        a server speaking enough of the Redis protocol for PyRedisPool, GET, SET, MGET,
+        MSET, DEL, EXISTS, INCR(BY), EXPIRE, KEYS and FLUSHALL, every connection is
+        served by a thread of its own. it runs in-process, or in a process of its own
+        with python FakeRedisServer.py, which prints host:port and serves until stdin
+        is closed
+
+        Usage:
+        server = FakeRedisServer()
+        server.start()
+        pool = PyRedisPool({'host': server.host, 'port': server.port, 'db': 0})
+        ...
+        server.stop()
+
+        Args:
+        * [host] str, default is 127.0.0.1
+        * [port] int, default is 0, a free port
+        """
+        socketserver.ThreadingTCPServer.__init__(self, (host, port), _Handler)
+        self.host, self.port = self.server_address[:2]
+        self.store = _Store()
+        self.thread = None
+
+    def start(self):
+        """
+        serve on a daemon thread
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever, name="FakeRedisServer", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        stop serving and close the socket
+        """
+        if self.thread is not None:
+            self.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="serve a fake redis until stdin is closed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="default is 0, a free port")
+    options = parser.parse_args()
+
+    server = FakeRedisServer(options.host, options.port).start()
+    print(f"{server.host}:{server.port}", flush=True)
+    try:
+        sys.stdin.read()
+    except KeyboardInterrupt:
+        pass
+    server.stop()
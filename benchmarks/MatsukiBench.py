@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# run from a checkout without installing matsuki
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from matsuki.pysql.PySQLReplay import percentile
+
+FORMAT = "matsuki-bench"
+VERSION = 1
+
+# threads of the redis benchmarks, the sql pool ones are set by --threads
+_REDIS_THREADS = (1, 8)
+
+
+class Skipped(Exception):
+    """
+    a section cannot run here, such as a missing package
+    """
+
+
+def measure(func, seconds: float = 1.0, threads: int = 1):
+    """
+    call func repeatedly on threads for seconds, every call is timed
+
+    Args:
+    * [func] callable without args
+    * [seconds] float, how long each thread calls func, default is 1
+    * [threads] int, default is 1, func is called on the current thread
+
+    Returns:
+    * [dict] threads, operations, errors, error (the first one), seconds, throughput (calls per second)
+        and latency (seconds of p50, p90, p99, max and mean)
+    """
+    threads = max(int(threads), 1)
+    latencies = [[] for _ in range(threads)]  # a list per thread, merged at the end
+    errors = [0] * threads
+    failures = []
+    barrier = threading.Barrier(threads)
+
+    def loop(index):
+        samples = latencies[index]
+        clock = time.perf_counter
+        barrier.wait()
+
+        now = clock()
+        end = now + seconds
+        while now < end:
+            try:
+                func()
+            except Exception as e:
+                errors[index] += 1
+                if not failures:
+                    failures.append(repr(e))
+            done = clock()
+            samples.append(done - now)
+            now = done
+
+    started = time.perf_counter()
+    if threads == 1:  # flask contexts and the like stay usable
+        loop(0)
+    else:
+        workers = [threading.Thread(target=loop, args=(i,), name=f"MatsukiBench-{i}", daemon=True)
+                   for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    elapsed = time.perf_counter() - started
+
+    values = sorted([value for items in latencies for value in items])
+    return {
+        "threads": threads,
+        "operations": len(values),
+        "errors": sum(errors),
+        "error": failures[0] if failures else None,
+        "seconds": elapsed,
+        "throughput": len(values) / elapsed if elapsed > 0 else 0.0,
+        "latency": {
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "p99": percentile(values, 0.99),
+            "max": values[-1] if values else 0.0,
+            "mean": sum(values) / len(values) if values else 0.0,
+        },
+    }
+
+
+def _quiet(workdir):
+    """
+    logger params of the pools, nothing printed nor written
+    """
+    return {'bstd': False, 'blog': False, 'dir': workdir, 'fname': "bench.log"}
+
+
+def _sqlite_pool(size, options):
+    from matsuki.pysql.PySQLPool import PySQLPool
+
+    params = _quiet(options.workdir)
+    params.update({
+        'driver': "sqlite",
+        'driver_options': {'database': ":memory:", 'namespace': "matsuki-bench"},
+        'checkout_timeout': 60,
+    })
+    pool = PySQLPool(size, params)
+    pool.wait_ready()
+    return pool
+
+
+def bench_sql_pool(options):
+    """
+    checkout and return of PySQLPool connections, with and without a statement,
+    on a pool of pool_size connections of the sqlite driver
+    """
+    from matsuki.pysql import PySQLConnection
+
+    pool = _sqlite_pool(options.pool_size, options)
+
+    def checkout():
+        pool.put_connection(pool.get_connection(raise_error=True))
+
+    def checkout_query():
+        conn = pool.get_connection(raise_error=True)
+        try:
+            PySQLConnection.query(conn, "SELECT 1 AS `one`")
+        finally:
+            pool.put_connection(conn)
+
+    results = {}
+    try:
+        for threads in options.threads:
+            results[f"checkout/threads={threads}"] = measure(checkout, options.seconds, threads)
+        for threads in options.threads:
+            results[f"checkout_query/threads={threads}"] = measure(checkout_query, options.seconds, threads)
+        results["stats"] = pool.stats()
+    finally:
+        pool.close()
+    return results
+
+
+def bench_sql_statements(options):
+    """
+    statement building of PySafeSQLCmd, cold (an uncached build with its identifier checks)
+    and warm (a repeated call site), and whole safe commands on the sqlite driver
+    """
+    from matsuki.pysql import PySQLConnection
+    from matsuki.pysql import PySafeSQLCmd
+
+    db, table = "bench", "users"
+    keys = ("name", "email", "age", "score")
+    row = {"name": "matsuki", "email": "matsuki@example.com", "age": 18, "score": 99.5}
+    select = ("`id`, `name`, `email`", "`age`>%s AND `score`<%s", "`id` DESC")
+
+    builders = {
+        "insert": (PySafeSQLCmd._insert_statement, (db, table, keys)),
+        "select": (PySafeSQLCmd._select_statement, (db, (table,)) + select),
+        "update": (PySafeSQLCmd._update_statement, (db, table, keys)),
+        "query_ids/size=100": (PySafeSQLCmd._query_ids_statement, (db, table, 100)),
+        "update_many/size=500": (PySafeSQLCmd._update_many_statement, (db, table, keys, 500)),
+        "upsert/size=500": (PySafeSQLCmd._upsert_statement, (db, table, keys, keys[2:], 500)),
+    }
+
+    results = {}
+    for name, (builder, args) in builders.items():
+        cold = builder.__wrapped__
+        results[f"{name}/cold"] = measure(lambda: cold(*args), options.seconds)
+        results[f"{name}/warm"] = measure(lambda: builder(*args), options.seconds)
+
+    pool = _sqlite_pool(1, options)
+    conn = pool.get_connection(raise_error=True)
+    try:
+        PySQLConnection.execute(conn, f"DROP TABLE IF EXISTS `{db}`.`{table}`")
+        PySQLConnection.execute(conn, f"CREATE TABLE `{db}`.`{table}` (`id` BIGINT PRIMARY KEY AUTO_INCREMENT, "
+                                      f"`name` VARCHAR(64), `email` VARCHAR(128), `age` INT, `score` DOUBLE)")
+        PySafeSQLCmd.safe_bulk_insert(conn, db, table, [dict(row, age=i % 100) for i in range(1000)])
+
+        # 10 rows of the age, the rows inserted later are older than all of them
+        results["safe_query_id"] = measure(lambda: PySafeSQLCmd.safe_query_id(conn, db, table, 500),
+                                           options.seconds)
+        results["safe_simple_query"] = measure(
+            lambda: PySafeSQLCmd.safe_simple_query(conn, db, table, select[0], "`age`=%s", where_args=(18,)),
+            options.seconds)
+        results["safe_insert"] = measure(lambda: PySafeSQLCmd.safe_insert(conn, db, table, dict(row, age=100)),
+                                         options.seconds)
+    finally:
+        pool.put_connection(conn)
+        pool.close()
+    return results
+
+
+def _redis_pool(options):
+    """
+    PyRedisPool of --redis, or of a FakeRedisServer process, and the process to stop
+    """
+    try:
+        from matsuki.pyredis.PyRedisPool import PyRedisPool
+    except ImportError as e:
+        raise Skipped(f"redis is not installed: {e}")
+
+    server = None
+    if options.redis:
+        host, _, port = options.redis.rpartition(":")
+    else:  # a process of its own, so the server does not share the GIL with the benchmark
+        server = subprocess.Popen([sys.executable, os.path.join(_HERE, "FakeRedisServer.py")],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        host, _, port = server.stdout.readline().strip().rpartition(":")
+        if not port:
+            server.kill()
+            raise Skipped("the fake redis server did not start")
+
+    params = _quiet(options.workdir)
+    params.update({'host': host or "127.0.0.1", 'port': int(port), 'db': 0})
+    return PyRedisPool(params), server
+
+
+def bench_redis_pool(options):
+    """
+    get, set and mget of PyRedisPool, against --redis or a FakeRedisServer process
+    """
+    pool, server = _redis_pool(options)
+    prefix = "matsuki:bench:"
+    value = b"x" * 256
+    keys = [f"{prefix}{i}" for i in range(100)]
+    for key in keys:
+        pool.set_variable(key, value)
+
+    # PyRedisPool logs the failures instead of raising them
+    def check(result):
+        if result is None:
+            raise RuntimeError("redis command failed, see the log")
+
+    results = {}
+    try:
+        for threads in _REDIS_THREADS:
+            results[f"set/threads={threads}"] = measure(lambda: pool.set_variable(keys[0], value),
+                                                        options.seconds, threads)
+            results[f"get/threads={threads}"] = measure(lambda: check(pool.get_variable(keys[0])),
+                                                        options.seconds, threads)
+            results[f"mget/keys=100/threads={threads}"] = measure(lambda: check(pool.get_mulvars(keys)),
+                                                                  options.seconds, threads)
+    finally:
+        pool.remove(keys)
+        if server is not None:  # the server exits when its stdin is closed
+            server.stdin.close()
+            server.wait(5)
+    return results
+
+
+def bench_redis_token(options):
+    """
+    encode and decode of RedisDataToken for the common payloads
+    """
+    try:
+        from matsuki.pyredis.RedisDataToken import RedisDataToken
+    except ImportError as e:
+        raise Skipped(f"redis is not installed: {e}")
+
+    payloads = {
+        "str": "matsuki " * 8,
+        "dict": {"id": 1, "name": "matsuki", "roles": ["admin", "user"], "score": 99.5},
+        "bytes=1k": os.urandom(1024),
+    }
+
+    results = {}
+    for name, payload in payloads.items():
+        token = RedisDataToken()
+        encoded = token.encode(payload)
+        results[f"encode/{name}"] = measure(lambda: token.encode(payload), options.seconds)
+        results[f"decode/{name}"] = measure(lambda: token.decode(encoded), options.seconds)
+    return results
+
+
+def bench_token_manager(options):
+    """
+    create and verify of TokenManager auth tokens
+    """
+    try:
+        from matsuki.tools import TokenManager
+    except ImportError as e:  # itsdangerous 2.1 removed the timed serializer
+        raise Skipped(f"TokenManager cannot be imported: {e}")
+
+    secret = "matsuki-bench-secret"
+    data = {"id": 1, "name": "matsuki", "roles": ["admin", "user"]}
+    token = TokenManager.create_auth_token(secret, data)
+
+    def verify():
+        status, _ = TokenManager.verify_auth_token(token, secret)
+        if status != TokenManager.TOKEN_STATUS.OK:
+            raise RuntimeError(f"token verified with {status.name}")
+
+    return {
+        "create": measure(lambda: TokenManager.create_auth_token(secret, data), options.seconds),
+        "verify": measure(verify, options.seconds),
+    }
+
+
+def bench_args_verification(options):
+    """
+    regular_verified_args of ArgsVerificationPage, on its own in a request context and
+    through the Flask test client, next to a route returning the args unchecked
+    """
+    try:
+        from flask import Flask, jsonify, request
+        from matsuki.framework import ArgsVerificationPage
+        from matsuki.tools import FlaskRequestSimplify
+    except ImportError as e:
+        raise Skipped(f"flask is not installed: {e}")
+
+    rule = os.path.join(options.workdir, "bench.rules")
+    with open(rule, "w") as f:
+        f.write("email to_email ^[a-zA-Z0-9_-]+@[a-zA-Z0-9_-]+(\\.[a-zA-Z0-9_-]+)+$\n")
+        f.write("phone to_phone ^[+]*[(]{0,1}[0-9]{1,4}[)]{0,1}[-\\s\\./0-9]*$\n")
+        f.write("age to_age ^[0-9]+$\n")
+        f.write("name to_name ^[A-Za-z]{1,32}$\n")
+    form = {"email": "matsuki@example.com", "phone": "0851-123456789", "age": "18", "name": "Matsuki"}
+
+    app = Flask("MatsukiBench")
+
+    @app.route("/plain", methods=["POST"])
+    def plain():
+        return jsonify(FlaskRequestSimplify.simplify_request(request)[0])
+
+    @app.route("/regular", methods=["POST"])
+    def regular():
+        ok, args, _ = ArgsVerificationPage.regular_verified_args(request, rule)
+        return jsonify(args), 200 if ok else 400
+
+    results = {}
+    with app.test_request_context("/regular", method="POST", data=form):
+        results["regular/direct"] = measure(lambda: ArgsVerificationPage.regular_verified_args(request, rule),
+                                            options.seconds)
+
+    client = app.test_client()
+
+    def post(path):
+        response = client.post(path, data=form)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+
+    results["plain/client"] = measure(lambda: post("/plain"), options.seconds)
+    results["regular/client"] = measure(lambda: post("/regular"), options.seconds)
+    return results
+
+
+# name -> benchmark(options), in the order they run
+SECTIONS = {
+    "sql_pool": bench_sql_pool,
+    "sql_statements": bench_sql_statements,
+    "redis_pool": bench_redis_pool,
+    "redis_token": bench_redis_token,
+    "token_manager": bench_token_manager,
+    "args_verification": bench_args_verification,
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(options):
+    """
+    run the sections of options.only, all of them by default
+
+    Returns:
+    * [dict] meta, results {section: {benchmark: measure result}} and skipped {section: reason}
+    """
+    report = {
+        "format": FORMAT,
+        "version": VERSION,
+        "meta": {
+            "time": time.time(),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seconds": options.seconds,
+            "pool_size": options.pool_size,
+            "redis": options.redis or "fake",
+        },
+        "results": {},
+        "skipped": {},
+    }
+
+    for name in options.only or SECTIONS.keys():
+        print(f"running {name}", file=sys.stderr)
+        try:
+            report["results"][name] = SECTIONS[name](options)
+        except Skipped as e:
+            report["skipped"][name] = str(e)
+            print(f"skipped {name}: {e}", file=sys.stderr)
+    return report
+
+
+def _rows(report):
+    for section, results in report["results"].items():
+        for name, result in results.items():
+            if isinstance(result, dict) and "throughput" in result:
+                yield f"{section}/{name}", result
+
+
+def summary(report, baseline=None):
+    """
+    a table of throughput and p99 latency, compared with a baseline report if given
+    """
+    before = dict(_rows(baseline)) if baseline is not None else {}
+    lines = [f"{'benchmark':<56} {'ops/s':>12} {'p99 us':>10} {'errors':>7}" + ("  vs baseline" if before else "")]
+
+    for name, result in _rows(report):
+        line = f"{name:<56} {result['throughput']:>12.0f} {result['latency']['p99'] * 1e6:>10.1f} " \
+               f"{result['errors']:>7}"
+        old = before.get(name)
+        if old is not None and old["throughput"] > 0:
+            line += f"  {result['throughput'] / old['throughput']:.2f}x ops/s"
+            if old["latency"]["p99"] > 0:
+                line += f", {result['latency']['p99'] / old['latency']['p99']:.2f}x p99"
+        lines.append(line)
+
+    for section, reason in report["skipped"].items():
+        lines.append(f"{section:<56} skipped, {reason}")
+    return "\n".join(lines)
+
+
+def _load(path):
+    with open(path, encoding="utf8") as f:
+        report = json.load(f)
+    if report.get("format") != FORMAT:
+        raise ValueError(f"{path} is not a report of {FORMAT}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmarks of the matsuki hot paths, saved as json")
+    parser.add_argument("--only", default=None,
+                        help=f"comma separated sections, default is all of {', '.join(SECTIONS.keys())}")
+    parser.add_argument("--seconds", type=float, default=1.0, help="seconds of every benchmark, default is 1")
+    parser.add_argument("--threads", default="1,2,4,8,16,32,64",
+                        help="thread counts of the sql pool checkout, default is 1,2,4,8,16,32,64")
+    parser.add_argument("--pool-size", type=int, default=8, help="connections of the sql pool, default is 8")
+    parser.add_argument("--redis", default=None, help="host:port of a redis server, default is a FakeRedisServer process")
+    parser.add_argument("--output", default=None, help="json file of the results, default is bench-<time>.json")
+    parser.add_argument("--compare", default=None, help="json file of an earlier run to compare with")
+    options = parser.parse_args()
+
+    options.only = [name.strip() for name in options.only.split(",")] if options.only else None
+    for name in options.only or ():
+        if name not in SECTIONS:
+            parser.error(f"unknown section {name}")
+    options.threads = [int(threads) for threads in options.threads.split(",")]
+    baseline = _load(options.compare) if options.compare else None
+
+    with tempfile.TemporaryDirectory(prefix="matsuki-bench-") as workdir:
+        options.workdir = workdir
+        report = run(options)
+
+    output = options.output or time.strftime("bench-%Y%m%d-%H%M%S.json")
+    with open(output, "w", encoding="utf8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+    print(summary(report, baseline))
+    print(f"results saved to {output}", file=sys.stderr)
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 # Author: Orlando Chen
 # Created: Sep 20, 2018
-# Modified: Mar 17, 2020
+# Modified: Oct 18, 2026
 
 import redis
 
@@ -116,6 +116,25 @@ class PyRedisPool(object):
 
     
 
+    def increase(self, key, amount=1):
+        """
+        increase an integer variable, a missing key is created with the amount
+
+        Args:
+        * [key] str key of data
+        * [amount] int, default is 1
+
+        Returns:
+        * [int] the value after increasing
+        """
+        try:
+            return redis.Redis(connection_pool=self.pool).incrby(key, amount)
+        except Exception as e:
+            self.logger.message(p.ERROR, msg="increase variable failed", exception=e)
+
+
+
+
     def ping(self):
         """
         ping the server
@@ -168,10 +187,10 @@ class PyRedisPool(object):
         try:
             if type(keys) is str:
                 redis.Redis(connection_pool=self.pool).delete(keys)
-            elif type(key) is str:
+            elif type(keys) is list:
                 redis.Redis(connection_pool=self.pool).delete(*keys)
             else:
-                self.logger.message(p.Error, msg="remove key with an invalid key type")
+                self.logger.message(p.ERROR, msg="remove key with an invalid key type")
         except Exception as e:
             self.logger.message(p.ERROR, msg="remove key(s) failed", exception=e)
 
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from matsuki.pysql import PySafeSQLCmd
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PySQLPool import PySQLPool
+from matsuki.pysql.PySQLPool import PySQLPoolException
+from siki.basics import Exceptions
+
+
+class AsyncConnection(object):
+    """
+    A pooled connection used from coroutines, every call runs on the executor
+    of the async pool, one call at a time since pymysql connections are not thread safe
+    """
+
+    def __init__(self, owner, conn):
+        self.owner = owner
+        self.conn = conn
+        self.lock = asyncio.Lock()
+
+    async def run(self, func, *args, **kwargs):
+        """
+        run func(conn, *args, **kwargs) on the executor
+
+        @Returns:
+        * [any] the result of func
+        """
+        async with self.lock:
+            return await self.owner.run(func, self.conn, *args, **kwargs)
+
+    def transaction(self):
+        """
+        async version of PySafeSQLCmd.transaction
+
+        Usage:
+        async with conn.transaction():
+            await PyAsyncSQL.safe_update(conn, db, table, item_id, args)
+            await PyAsyncSQL.safe_insert(conn, db, table, args)
+        """
+        return _AsyncTransaction(self)
+
+    async def execute(self, statement, args=None):
+        return await self.run(PySQLConnection.execute, statement, args)
+
+    async def query(self, statement, args=None, result=PySQLConnection.DICT):
+        return await self.run(PySQLConnection.query, statement, args, result)
+
+
+class _AsyncTransaction(object):
+    """
+    async context manager of AsyncConnection.transaction, the scope is
+    opened and closed on the executor
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.scope = None
+
+    async def __aenter__(self):
+        self.scope = PySafeSQLCmd.transaction(self.connection.conn)
+        async with self.connection.lock:
+            await self.connection.owner.run(self.scope.__enter__)
+        return self.connection
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        scope, self.scope = self.scope, None
+        async with self.connection.lock:
+            return await self.connection.owner.run(scope.__exit__, exc_type, exc_val, exc_tb)
+
+
+class _AsyncAcquire(object):
+    """
+    async context manager of AsyncPySQLPool.acquire
+    """
+
+    def __init__(self, owner, timeout):
+        self.owner = owner
+        self.timeout = timeout
+        self.connection = None
+
+    async def __aenter__(self):
+        self.connection = await self.owner.get_connection(self.timeout)
+        return self.connection
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        connection, self.connection = self.connection, None
+        await self.owner.put_connection(connection)
+        return False
+
+
+class AsyncPySQLPool(object):
+
+    def __init__(self, pool: PySQLPool, max_workers: int = None):
+        """
+        asyncio facade of a PySQLPool, coroutines share the pymysql connections of the
+        pool through a bounded executor. when every connection is in use, acquire
+        waits on a semaphore without holding any thread.
+
+        Args:
+        * [pool] PySQLPool
+        * [max_workers] the number of connections coroutines may hold at the same time,
+            default is the maximum size of pool
+        """
+        if not isinstance(pool, PySQLPool):
+            raise Exceptions.NoAvailableResourcesFoundException("database is not available")
+
+        self.pool = pool
+        self.max_workers = max(int(max_workers or pool.max_size), 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="PyAsyncSQL")
+        self.semaphore = None  # created on the running event loop
+
+    async def run(self, func, *args, **kwargs):
+        """
+        run a blocking function on the executor
+
+        Returns:
+        * [any] the result of func
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def acquire(self, timeout: float = None):
+        """
+        Draw a connection from pool
+
+        Usage:
+        async with pool.acquire() as conn:
+            await PyAsyncSQL.safe_query_id(conn, db, table, item_id)
+
+        Args:
+        * [timeout] seconds to wait for a free connection, default is the pool checkout_timeout
+
+        Returns:
+        * [async context manager] yields AsyncConnection
+        """
+        return _AsyncAcquire(self, timeout)
+
+    async def get_connection(self, timeout: float = None):
+        """
+        Draw a connection from pool, waits without blocking the event loop
+
+        Args:
+        * [timeout] seconds to wait for a free connection, default is the pool checkout_timeout
+
+        Returns:
+        * [conn] AsyncConnection, raises PySQLPoolException if failed
+        """
+        if timeout is None:
+            timeout = self.pool.timeout
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_workers)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise PySQLPoolException("get connection timeout, pool exhausted")
+
+        # the time left of timeout, not the whole of it again
+        checkout = loop.run_in_executor(self.executor, self.pool.get_connection, max(deadline - loop.time(), 0), True)
+        try:
+            conn = await asyncio.shield(checkout)
+        except asyncio.CancelledError:
+            # the executor thread still draws the connection, put it back when it is done
+            checkout.add_done_callback(self._put_back)
+            raise
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+        return AsyncConnection(self, conn)
+
+    def _put_back(self, checkout):
+        """
+        done callback of a checkout whose caller was cancelled
+        """
+        try:
+            if not checkout.cancelled() and checkout.exception() is None:
+                self.pool.put_connection(checkout.result())
+        finally:
+            self.semaphore.release()
+
+    async def put_connection(self, connection: AsyncConnection):
+        """
+        Put a connection back to pool
+
+        Args:
+        * [connection] AsyncConnection
+        """
+        if connection is None:
+            return
+
+        try:
+            self.pool.put_connection(connection.conn)
+        finally:
+            self.semaphore.release()
+
+    def close(self):
+        """
+        stop the executor, the sql pool is left open
+        """
+        self.executor.shutdown(wait=False)
+
+
+class AsyncIdLoader(object):
+
+    def __init__(self, conn: AsyncConnection, db, table, chunk_size: int = 1000):
+        """
+        rows by id for one request, the loads of coroutines made in the same turn of
+        the event loop are coalesced into one safe_query_ids, and every row is loaded once
+
+        Usage:
+        loader = AsyncIdLoader(conn, db, table)
+        users = await asyncio.gather(*[loader.load(item["user_id"]) for item in items])
+
+        Args:
+        * [conn] AsyncConnection
+        * [db] database name
+        * [table] table name
+        * [chunk_size] int, the number of ids of a query, default is 1000
+        """
+        self.conn = conn
+        self.db = db
+        self.table = table
+        self.chunk_size = chunk_size
+        self.rows = {}  # id -> row, None if not found
+        self.waiting = {}  # id -> future
+        self.tasks = set()  # dispatches in flight, referenced so they are not collected
+
+    async def load(self, item_id):
+        """
+        Returns:
+        * [row(dict)] the row of item_id, None if not found
+        """
+        if item_id in self.rows:
+            return self.rows[item_id]
+
+        future = self.waiting.get(item_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self.waiting:  # first load of the batch, dispatch when the others are queued
+                loop.call_soon(self._schedule, loop)
+            future = loop.create_future()
+            self.waiting[item_id] = future
+
+        return await future
+
+    async def load_many(self, ids):
+        """
+        Returns:
+        * [list] rows in the order of ids, None for the ids not found
+        """
+        return list(await asyncio.gather(*[self.load(item_id) for item_id in ids]))
+
+    def _schedule(self, loop):
+        task = loop.create_task(self._dispatch())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _dispatch(self):
+        waiting, self.waiting = self.waiting, {}
+
+        try:
+            found = await safe_query_ids(self.conn, self.db, self.table, list(waiting.keys()),
+                                         chunk_size=self.chunk_size)
+        except Exception as e:
+            for future in waiting.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item_id, future in waiting.items():
+            self.rows[item_id] = found.get(item_id)
+            if not future.done():
+                future.set_result(self.rows[item_id])
+
+
+async def reflect_request_with_database_callback(database: AsyncPySQLPool, do_action: object, *args):
+    """
+    async version of PyCallback.reflect_request_with_database_callback
+
+    @Args:
+    * [database] AsyncPySQLPool
+    * [do_action] coroutine function, callback(conn, *args), conn is AsyncConnection
+    * [args] user arguments
+    """
+    if not isinstance(database, AsyncPySQLPool):
+        raise Exceptions.NoAvailableResourcesFoundException("database is not available")
+
+    async with database.acquire() as conn:
+        return await do_action(conn, *args)
+
+
+async def safe_insert(conn: AsyncConnection, db, table, args, debug=False):
+    return await conn.run(PySafeSQLCmd.safe_insert, db, table, args, debug)
+
+
+async def safe_bulk_insert(conn: AsyncConnection, db, table, rows, debug=False, max_packet=None):
+    return await conn.run(PySafeSQLCmd.safe_bulk_insert, db, table, rows, debug, max_packet)
+
+
+async def safe_query_id(conn: AsyncConnection, db, table, item_id, debug=False):
+    return await conn.run(PySafeSQLCmd.safe_query_id, db, table, item_id, debug)
+
+
+async def safe_query_ids(conn: AsyncConnection, db, table, ids, debug=False, chunk_size=1000):
+    return await conn.run(PySafeSQLCmd.safe_query_ids, db, table, ids, debug, chunk_size)
+
+
+async def safe_simple_query(conn: AsyncConnection, db, table, select_con, where_con=None, order_by=None, debug=False,
+                            where_args=None, result=PySQLConnection.DICT):
+    return await conn.run(PySafeSQLCmd.safe_simple_query, db, table, select_con, where_con, order_by, debug,
+                          where_args, result)
+
+
+async def safe_simple_query_iter(conn: AsyncConnection, db, table, select_con, where_con=None, order_by=None,
+                                 debug=False, where_args=None, chunk_size=1000, result=PySQLConnection.DICT):
+    """
+    async generator of PySafeSQLCmd.safe_simple_query_iter, each chunk is fetched on the executor
+
+    Usage:
+    async for rows in PyAsyncSQL.safe_simple_query_iter(conn, db, table, "*"):
+        ...
+    """
+    async with conn.lock:
+        chunks = await conn.owner.run(PySafeSQLCmd.safe_simple_query_iter, conn.conn, db, table, select_con,
+                                      where_con, order_by, debug, where_args, chunk_size, result)
+        try:
+            while True:
+                rows = await conn.owner.run(next, chunks, None)
+                if rows is None:
+                    break
+                yield rows
+        finally:
+            await conn.owner.run(chunks.close)
+
+
+async def safe_paged_query(conn: AsyncConnection, db, table, select_con, where_con=None, where_args=None, key="id",
+                           page_size=50, cursor=None, descending=False, debug=False):
+    return await conn.run(PySafeSQLCmd.safe_paged_query, db, table, select_con, where_con, where_args, key, page_size,
+                          cursor, descending, debug)
+
+
+async def safe_multiple_tables_query(conn: AsyncConnection, db: str, tables: list, select_con, where_con=None,
+                                     order_by=None, debug=False, where_args=None, result=PySQLConnection.DICT):
+    return await conn.run(PySafeSQLCmd.safe_multiple_tables_query, db, tables, select_con, where_con, order_by, debug,
+                          where_args, result)
+
+
+async def safe_update(conn: AsyncConnection, db, table, item_id, args, debug=False):
+    return await conn.run(PySafeSQLCmd.safe_update, db, table, item_id, args, debug)
+
+
+async def safe_delete(conn: AsyncConnection, db, table, item_id, debug=False):
+    return await conn.run(PySafeSQLCmd.safe_delete, db, table, item_id, debug)
+
+
+async def safe_update_many(conn: AsyncConnection, db, table, items, debug=False, chunk_size=500):
+    return await conn.run(PySafeSQLCmd.safe_update_many, db, table, items, debug, chunk_size)
+
+
+async def safe_delete_many(conn: AsyncConnection, db, table, ids, debug=False, chunk_size=1000):
+    return await conn.run(PySafeSQLCmd.safe_delete_many, db, table, ids, debug, chunk_size)
+
+
+async def safe_upsert(conn: AsyncConnection, db, table, rows, update_keys=None, debug=False, chunk_size=500):
+    return await conn.run(PySafeSQLCmd.safe_upsert, db, table, rows, update_keys, debug, chunk_size)
+
+
+async def safe_query_tables(conn: AsyncConnection, db):
+    return await conn.run(PySafeSQLCmd.safe_query_tables, db)
+
+
+async def safe_query_columns(conn: AsyncConnection, db, table):
+    return await conn.run(PySafeSQLCmd.safe_query_columns, db, table)
+
+
+async def safe_query_column_types(conn: AsyncConnection, db, table):
+    return await conn.run(PySafeSQLCmd.safe_query_column_types, db, table)
@@ -1,14 +1,14 @@
 # -*- coding: utf-8 -*-
 # Author: Orlando Chen
 # Create: Apr 15, 2020
-# Modified: Apr 21, 2020
+# Modified: Oct 18, 2026
 
-from matsuki.pysql import PySQLConnection
 from matsuki.pysql.PySQLPool import PySQLPool
+from matsuki.pysql.PyRoutingPool import PyRoutingPool
 from siki.basics import Exceptions
 
 
-def reflect_request_with_all_callback(database: PySQLPool, cache: object, do_action: object, *args):
+def reflect_request_with_all_callback(database: object, cache: object, do_action: object, *args):
     """
     用于数据库连接池自释放，提供一个可供用户使用的数据库连接和回调函数
 
@@ -18,21 +18,14 @@ def reflect_request_with_all_callback(database: PySQLPool, cache: object, do_act
     * [do_action] 回调函数, 函数结构为callback(conn, [args]), 如果不需要附加参数，那么回调函数只为callback(conn)
     * [args] 用户需要添加的参数
     """
-    if not isinstance(database, PySQLPool):
+    if not isinstance(database, (PySQLPool, PyRoutingPool)):
         raise Exceptions.NoAvailableResourcesFoundException("database is not available")
 
     if cache is None:
         raise Exceptions.NullPointerException("cache is not available")
 
-    conn = None
-
-    try:
-        # get connection from pool
-        conn = database.get_connection()
-
-        # check the connection status
-        if not PySQLConnection.check_connection(conn):
-            PySQLConnection.reconnect(conn)
+    # get connection of the current request from pool
+    with database.connection() as conn:
 
         # send database connection to callback function
         if args is None:
@@ -40,12 +33,8 @@ def reflect_request_with_all_callback(database: PySQLPool, cache: object, do_act
         else:
             return do_action(conn, cache, args)
 
-    finally:
-        if conn:
-            database.put_connection(conn)
-
 
-def reflect_request_with_database_callback(database: PySQLPool, do_action: object, *args):
+def reflect_request_with_database_callback(database: object, do_action: object, *args):
     """
     用于数据库连接池自释放，提供一个可供用户使用的数据库连接和回调函数
 
@@ -54,18 +43,11 @@ def reflect_request_with_database_callback(database: PySQLPool, do_action: objec
     * [do_action] 回调函数, 函数结构为callback(conn, [args]), 如果不需要附加参数，那么回调函数只为callback(conn)
     * [args] 用户需要添加的参数
     """
-    if not isinstance(database, PySQLPool):
+    if not isinstance(database, (PySQLPool, PyRoutingPool)):
         raise Exceptions.NoAvailableResourcesFoundException("database is not available")
 
-    conn = None
-
-    try:
-        # get connection from pool
-        conn = database.get_connection()
-
-        # check the connection status
-        if not PySQLConnection.check_connection(conn):
-            PySQLConnection.reconnect(conn)
+    # get connection of the current request from pool
+    with database.connection() as conn:
 
         # send database connection to callback function
         if args is None:
@@ -73,10 +55,6 @@ def reflect_request_with_database_callback(database: PySQLPool, do_action: objec
         else:
             return do_action(conn, args)
 
-    finally:
-        if conn:
-            database.put_connection(conn)
-
 
 def reflect_request_with_cache_callback(cache: object, do_action: object, *args):
     """
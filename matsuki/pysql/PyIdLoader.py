@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+from matsuki.pysql import PySafeSQLCmd
+from siki.basics import Exceptions
+
+
+class IdLoader(object):
+
+    def __init__(self, conn, db, table, chunk_size: int = 1000):
+        """
+        rows by id for one request, the ids wanted before a get are loaded together
+        with one safe_query_ids, and every row is loaded once
+
+        Usage:
+        loader = IdLoader(conn, db, table)
+        loader.want(*[item["user_id"] for item in items])
+        for item in items:
+            item["user"] = loader.get(item["user_id"])  # one round trip for all users
+
+        Args:
+        * [conn] connection of sql, or routing session
+        * [db] database name
+        * [table] table name
+        * [chunk_size] int, the number of ids of a query, default is 1000
+        """
+        if conn is None:
+            raise Exceptions.InvalidParamException("conn cannot be null")
+
+        self.conn = conn
+        self.db = db
+        self.table = table
+        self.chunk_size = chunk_size
+        self.rows = {}  # id -> row, None if not found
+        self.pending = {}  # ids wanted but not loaded yet, dict keeps the order
+
+    def want(self, *ids):
+        """
+        queue ids, they are loaded with the next get or flush
+        """
+        for item_id in ids:
+            if item_id not in self.rows:
+                self.pending[item_id] = None
+
+    def flush(self):
+        """
+        load the queued ids
+        """
+        if not self.pending:
+            return
+
+        ids, self.pending = list(self.pending.keys()), {}
+        found = PySafeSQLCmd.safe_query_ids(self.conn, self.db, self.table, ids, chunk_size=self.chunk_size)
+        for item_id in ids:
+            self.rows[item_id] = found.get(item_id)
+
+    def get(self, item_id):
+        """
+        Returns:
+        * [row(dict)] the row of item_id, None if not found
+        """
+        if item_id not in self.rows:
+            self.want(item_id)
+            self.flush()
+        return self.rows[item_id]
+
+    def get_many(self, ids):
+        """
+        Returns:
+        * [rows(dict)] {id: row} of the ids found
+        """
+        self.want(*ids)
+        self.flush()
+        return {item_id: self.rows[item_id] for item_id in ids if self.rows[item_id] is not None}
+
+    def clear(self, item_id=None):
+        """
+        forget a loaded row, or all of them, after the rows are written
+        """
+        if item_id is None:
+            self.rows.clear()
+        else:
+            self.rows.pop(item_id, None)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import base64
+import datetime
+import decimal
+import hashlib
+import time
+
+from matsuki.pyredis.PyRedisPool import PyRedisPool
+from matsuki.pyredis.RedisDataToken import RedisDataToken
+from siki.basics import Exceptions
+
+# values of columns json cannot hold, stored as [tag, text], a column value is never a list
+_DECODERS = {
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "time": datetime.time.fromisoformat,
+    "timedelta": lambda text: datetime.timedelta(microseconds=int(text)),
+    "decimal": decimal.Decimal,
+    "bytes": base64.b64decode,
+}
+
+
+def encode_value(value):
+    """
+    json form of a column value, datetime, date, time, timedelta, Decimal and bytes are tagged
+    """
+    if isinstance(value, datetime.datetime):  # before date, a datetime is a date as well
+        return ["datetime", value.isoformat()]
+    if isinstance(value, datetime.date):
+        return ["date", value.isoformat()]
+    if isinstance(value, datetime.time):
+        return ["time", value.isoformat()]
+    if isinstance(value, datetime.timedelta):
+        return ["timedelta", str(value // datetime.timedelta(microseconds=1))]
+    if isinstance(value, decimal.Decimal):
+        return ["decimal", str(value)]
+    if isinstance(value, (bytes, bytearray)):
+        return ["bytes", base64.b64encode(bytes(value)).decode("ascii")]
+    return value
+
+
+def decode_value(value):
+    """
+    column value of its json form
+    """
+    if isinstance(value, list):
+        return _DECODERS[value[0]](value[1])
+    return value
+
+
+def _encode_rows(rows):
+    if isinstance(rows, dict):  # only one row returned
+        return {key: encode_value(value) for key, value in rows.items()}
+    if isinstance(rows, list):
+        return [_encode_rows(row) for row in rows]
+    return rows
+
+
+def _decode_rows(rows):
+    if isinstance(rows, dict):
+        return {key: decode_value(value) for key, value in rows.items()}
+    if isinstance(rows, list):
+        return [_decode_rows(row) for row in rows]
+    return rows
+
+
+class PyQueryCache(object):
+
+    def __init__(self, redis_pool: PyRedisPool, ttl: int = 60, prefix: str = "matsuki:sql"):
+        """
+        read-through cache of the reads of PySafeSQLCmd in redis. every table has a
+        version counter that writes to the table increase, an entry keeps the version
+        it was read at and is served only while the version is the same, so writes
+        invalidate entries without scanning keys, and stale entries just expire.
+
+        Usage:
+        PySafeSQLCmd.use_query_cache(PyQueryCache(redis_pool, ttl=30))
+
+        Args:
+        * [redis_pool] PyRedisPool
+        * [ttl] seconds an entry is kept, default is 60
+        * [prefix] prefix of the redis keys, default is matsuki:sql
+        """
+        if not isinstance(redis_pool, PyRedisPool):
+            raise Exceptions.InvalidParamException("redis_pool must be a PyRedisPool")
+
+        self.redis = redis_pool
+        self.ttl = int(ttl)
+        self.prefix = prefix
+
+    def version_key(self, db, table):
+        return f"{self.prefix}:version:{db}:{table}"
+
+    def entry_key(self, db, table, statement, args):
+        """
+        the key of a query, the statement is normalized by whitespaces
+        """
+        query = " ".join(statement.split()) + "|" + repr(tuple(args) if args is not None else None)
+        return f"{self.prefix}:rows:{db}:{table}:{hashlib.sha1(query.encode('utf8')).hexdigest()}"
+
+    def invalidate(self, db, table):
+        """
+        increase the version of table, the cached entries of table are not served anymore
+        """
+        version_key = self.version_key(db, table)
+        if self.redis.increase(version_key) == 1:
+            # the counter was evicted and started again from 1, move it past the
+            # versions the entries written before may have, as fetch does
+            self.redis.increase(version_key, time.time_ns())
+
+    def fetch(self, db, table, statement, args, loader):
+        """
+        rows of a query from the cache, or from the database if missing or stale
+
+        Args:
+        * [db] database name
+        * [table] table name
+        * [statement] str, the sql statement of the query
+        * [args] values bound to the statement
+        * [loader] function without arguments, queries the database
+
+        Returns:
+        * [rows(dict/list)] the result of loader
+        """
+        version_key = self.version_key(db, table)
+        entry_key = self.entry_key(db, table, statement, args)
+
+        cached = self.redis.get_mulvars([version_key, entry_key])
+        if cached is None:  # redis is not available
+            return loader()
+
+        version, entry = cached
+        if version is None:
+            # first use of the table, or the counter was evicted, start it from a value
+            # the entries written before cannot have
+            self.redis.increase(version_key, time.time_ns())
+            return loader()
+        version = version.decode("utf8")
+
+        if entry is not None:
+            try:
+                data = RedisDataToken().decode(entry)["data"]
+                if data["version"] == version:
+                    return _decode_rows(data["rows"])
+            except Exception:  # broken entry, read it again
+                pass
+
+        # the version was read before the rows, if the table is written meanwhile
+        # the entry is stale at once and never served
+        rows = loader()
+        try:
+            token = RedisDataToken().encode({"version": version, "rows": _encode_rows(rows)})
+        except Exception:  # values of other types cannot be stored in a token
+            return rows
+
+        self.redis.set_variable(entry_key, token, self.ttl)
+        return rows
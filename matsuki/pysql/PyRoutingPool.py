@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import itertools
+import time
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql import PyScopedConnection
+from matsuki.pysql.PySQLPool import PySQLPool
+from siki.basics import Exceptions
+
+
+class RoutingSession(object):
+    """
+    Connections of one request on a routing pool, the safe_* functions of PySafeSQLCmd
+    accept a session in place of a connection and route reads to a replica, writes to
+    the primary. Connections are checked out on first use and returned by close.
+    """
+
+    def __init__(self, owner, timeout: float = None):
+        self.owner = owner
+        self.timeout = timeout
+        self.primary = None
+        self.replica = None  # (pool, conn)
+        self.last_write = None
+
+    def writer(self):
+        """
+        connection of the primary, the read-your-writes window starts from now
+
+        Returns:
+        * [conn] pymysql.connect
+        """
+        if self.primary is None:
+            self.primary = self.owner.primary.get_connection(self.timeout, raise_error=True)
+
+        self.last_write = time.monotonic()
+        return self.primary
+
+    def reader(self):
+        """
+        connection of a replica, or of the primary within the read-your-writes
+        window or a transaction, or if no replica is available
+
+        Returns:
+        * [conn] pymysql.connect
+        """
+        if self.primary is not None and PySQLConnection.in_transaction(self.primary):
+            return self.primary
+
+        if self.last_write is not None and time.monotonic() - self.last_write < self.owner.read_your_writes:
+            return self.primary
+
+        if self.replica is None:
+            # a replica with every connection checked out is passed over at once,
+            # the others are waited for shortly, only the primary is waited for in full
+            for pool in self.owner.pick_replicas():
+                if pool.in_use >= pool.max_size:
+                    continue
+                conn = pool.get_connection(self.owner.replica_timeout)
+                if conn is not None:
+                    self.replica = (pool, conn)
+                    break
+            else:  # no replica available, read from primary
+                if self.primary is None:
+                    self.primary = self.owner.primary.get_connection(self.timeout, raise_error=True)
+                return self.primary
+
+        return self.replica[1]
+
+    def close(self):
+        """
+        return the connections to their pools
+        """
+        if self.primary is not None:
+            self.owner.primary.put_connection(self.primary)
+            self.primary = None
+
+        if self.replica is not None:
+            self.replica[0].put_connection(self.replica[1])
+            self.replica = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class PyRoutingPool(object):
+
+    def __init__(self, primary: PySQLPool, replicas: list = None, strategy: str = "least_in_use",
+                 read_your_writes: float = 0, replica_timeout: float = 0.1):
+        """
+        read/write splitting over a primary pool and replica pools
+
+        Args:
+        * [primary] PySQLPool of the primary server, every write goes here
+        * [replicas] list of PySQLPool of the read replicas
+        * [strategy] least_in_use or round_robin, how reads choose a replica
+        * [read_your_writes] seconds a session keeps reading from the primary after it wrote,
+            default is 0, reads always go to replicas
+        * [replica_timeout] seconds a read waits for each replica before trying the next one,
+            and then the primary, default is 0.1, a replica with every connection in use
+            is skipped at once
+        """
+        if not isinstance(primary, PySQLPool):
+            raise Exceptions.InvalidParamException("primary must be a PySQLPool")
+
+        if strategy not in ("least_in_use", "round_robin"):
+            raise Exceptions.InvalidParamException("strategy must be least_in_use or round_robin")
+
+        self.primary = primary
+        self.replicas = list(replicas or [])
+        self.strategy = strategy
+        self.read_your_writes = float(read_your_writes)
+        self.replica_timeout = float(replica_timeout)
+        self.counter = itertools.count()
+
+    def pick_replicas(self):
+        """
+        replicas in the order reads should try them
+
+        Returns:
+        * [list] PySQLPool
+        """
+        if len(self.replicas) <= 1:
+            return self.replicas
+
+        if self.strategy == "round_robin":
+            start = next(self.counter) % len(self.replicas)
+            return self.replicas[start:] + self.replicas[:start]
+
+        # the in use counters are read without locks, an approximation is enough here
+        return sorted(self.replicas, key=lambda pool: pool.in_use / pool.max_size)
+
+    def session(self, timeout: float = None):
+        """
+        Start a routing session
+
+        Usage:
+        with pool.session() as session:
+            PySafeSQLCmd.safe_query_id(session, db, table, item_id)
+
+        Args:
+        * [timeout] seconds to wait for a free connection, default is the pool checkout_timeout
+
+        Returns:
+        * [RoutingSession]
+        """
+        return RoutingSession(self, timeout)
+
+    def get_connection(self, timeout: float = None, raise_error: bool = True):
+        """
+        same as session, so that a routing pool can be used in place of a PySQLPool,
+        the session raises PySQLPoolException when the primary is not available
+        """
+        return RoutingSession(self, timeout)
+
+    def put_connection(self, session: RoutingSession):
+        """
+        close a session from get_connection
+        """
+        if session is not None:
+            session.close()
+
+    def connection(self, timeout: float = None):
+        """
+        Request scoped session, nested scopes of the same request or thread
+        share one session, see PySQLPool.connection
+        """
+        return PyScopedConnection.ScopedConnection(self, timeout)
+
+    def init_app(self, app):
+        """
+        Keep the session of a flask request until the request is torn down
+        """
+        PyScopedConnection.init_app(app, self)
+
+    def stats(self):
+        """
+        stats of the primary and replica pools
+
+        Returns:
+        * [dict] {'primary': dict, 'replicas': [dict, ...]}
+        """
+        return {"primary": self.primary.stats(), "replicas": [pool.stats() for pool in self.replicas]}
+
+    def close(self):
+        """
+        close the primary and replica pools
+        """
+        self.primary.close()
+        for pool in self.replicas:
+            pool.close()
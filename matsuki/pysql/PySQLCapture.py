@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import base64
+import datetime
+import decimal
+import json
+import queue
+import threading
+import time
+
+from matsuki.pysql import PySQLConnection
+from siki.basics.Logger import Logger
+from siki.basics.Logger import Priority
+
+# first line of a capture file, with the version of the format
+MAGIC = "matsuki-capture"
+VERSION = 1
+
+# statements longer than this, such as multi-row inserts, are written inline instead of numbered
+_NUMBERED_LENGTH = 2048
+
+
+def encode_value(value):
+    """
+    json form of a bound value, bytes are tagged so they are sent back as bytes
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return {"b": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, (datetime.date, datetime.time, datetime.timedelta, decimal.Decimal)):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def decode_value(value):
+    """
+    bound value of its json form
+    """
+    if isinstance(value, dict) and "b" in value:
+        return base64.b64decode(value["b"])
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    return value
+
+
+class PySQLCapture(object):
+
+    def __init__(self, path: str, params: dict = None):
+        """
+        record the statements of PySQLConnection to an append-only file, for
+        PySQLReplay. every line is json, statements are written once and then
+        referred to by number:
+
+        ["matsuki-capture", 1, wall clock of start]
+        ["S", statement number, statement]
+        [seconds since start, statement number, args, seconds taken, failed]
+
+        long statements, and the new ones once max_statements are numbered, are
+        written in place of their number.
+
+        the request threads only queue the statements, a writer thread
+        serializes them.
+
+        Usage:
+        capture = PySQLCapture("workload.capture")
+        capture.install()
+        ...
+        capture.uninstall()
+
+        Args:
+        * [path] capture file, appended if it exists
+        * [params] bstd, blog, dir, fname,
+            max_pending (statements waiting to be written, the others are dropped, default is 100000),
+            max_statements (distinct statements numbered, default is 10000)
+        """
+        params = params or {}
+
+        self.path = path
+        self.pending = queue.Queue(maxsize=int(params.get('max_pending', 100000)))
+        self.statements = {}  # statement -> number, used by the writer thread only
+        self.max_statements = int(params.get('max_statements', 10000))
+        self.started = time.perf_counter()
+        self.dropped = 0
+        self.writer = None
+
+        # init with configure file
+        if 'bstd' in params.keys() and 'blog' in params.keys() \
+                and 'dir' in params.keys() and 'fname' in params.keys():
+            self.logger = Logger(bool(params['bstd']), bool(params['blog']), params['dir'], params['fname'])
+        else:
+            self.logger = Logger(True, False)
+
+    def install(self):
+        """
+        start recording, every capture starts with its own header
+        """
+        if self.writer is not None:
+            return
+
+        self.started = time.perf_counter()
+        self.statements = {}
+        self.writer = threading.Thread(target=self._write, name="PySQLCapture", daemon=True)
+        self.writer.start()
+        PySQLConnection.add_listener(self.record)
+
+    def uninstall(self):
+        """
+        stop recording, and wait for the statements queued to be written
+        """
+        if self.writer is None:
+            return
+
+        PySQLConnection.remove_listener(self.record)
+        self.pending.put(None)
+        self.writer.join()
+        self.writer = None
+
+        if self.dropped:
+            self.logger.message(Priority.INFO, msg=f"capture dropped {self.dropped} statements")
+
+    def record(self, connection, statement, args, seconds, error=None):
+        """
+        listener of PySQLConnection, queues a statement
+        """
+        started = time.perf_counter() - seconds - self.started
+        try:
+            self.pending.put_nowait((started, statement, args, seconds, error is not None))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        with open(self.path, "a", encoding="utf8") as f:
+            f.write(json.dumps([MAGIC, VERSION, time.time()]) + "\n")
+
+            while True:
+                item = self.pending.get()
+                if item is None:
+                    break
+
+                started, statement, args, seconds, failed = item
+                if isinstance(statement, (bytes, bytearray)):
+                    statement = statement.decode("utf8", "replace")
+
+                number = self.statements.get(statement)
+                if number is None:
+                    if len(statement) > _NUMBERED_LENGTH or len(self.statements) >= self.max_statements:
+                        number = statement
+                    else:
+                        number = len(self.statements)
+                        self.statements[statement] = number
+                        f.write(json.dumps(["S", number, statement]) + "\n")
+
+                try:
+                    line = json.dumps([round(started, 6), number, args, round(seconds, 6), failed],
+                                      default=encode_value)
+                except Exception as e:
+                    self.logger.message(Priority.ERROR, msg="capture a statement failed", exception=e)
+                    continue
+                f.write(line + "\n")
+
+                if self.pending.empty():
+                    f.flush()
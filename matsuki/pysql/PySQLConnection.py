@@ -1,12 +1,51 @@
 # -*- coding: utf-8 -*-
 # Author: Orlando Chen
 # Create: May 08, 2018
-# Modified: Mar 11, 2020
+# Modified: Oct 18, 2026
+
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache
 
 import pymysql
+from pymysql.cursors import RE_INSERT_VALUES
 
 from siki.basics.Exceptions import *
 
+try:  # numpy is optional, without it columnar results are lists
+    import numpy
+except ImportError:
+    numpy = None
+
+# result formats of query and stream_query
+DICT = "dict"  # a dict per row
+TUPLE = "tuple"  # TupleResult, a tuple per row with a shared header
+SLOTS = "slots"  # an object with __slots__ per row, the attributes are the columns
+COLUMNS = "columns"  # {column: array}, numpy arrays if numpy is installed, else lists
+
+_FORMATS = (DICT, TUPLE, SLOTS, COLUMNS)
+
+# bytes left in a packet for the protocol header
+_PACKET_HEADROOM = 1024
+
+# connection -> depth of the nested transaction scopes opened on it
+_transactions = weakref.WeakKeyDictionary()
+
+# connection -> functions to call once its transaction is committed
+_after_commit = weakref.WeakKeyDictionary()
+
+# connection -> max_allowed_packet of its server, asked once per connection
+_packets = weakref.WeakKeyDictionary()
+
+# functions called after every statement, replaced as a whole so that it is iterated without lock
+_listeners = ()
+
+# depth of the unlistened scopes opened on the current thread
+_unlistened = threading.local()
+
 
 def check_null_params(**dict_args):
     """
@@ -21,7 +60,28 @@ def check_null_params(**dict_args):
     return False, None
 
 
-def connect(password, user="root", host="127.0.0.1", port=3306):
+def register_driver(name, connect_func):
+    """
+    add a driver to connect with, besides mysql and sqlite
+
+    @Args:
+    * [name] str, the driver argument of connect
+    * [connect_func] function, connect_func(**options) returns a connection with the
+        interface of a pymysql connection
+    """
+    _drivers[name] = connect_func
+
+
+def _connect_sqlite(**options):
+    from matsuki.pysql import PySQLiteDriver  # imported on demand, mysql users never load it
+    return PySQLiteDriver.connect(**options)
+
+
+# driver name -> connect function, mysql is built in
+_drivers = {"sqlite": _connect_sqlite}
+
+
+def connect(password=None, user="root", host="127.0.0.1", port=3306, driver="mysql", **options):
     """
     Create a connection to server
     
@@ -30,10 +90,21 @@ def connect(password, user="root", host="127.0.0.1", port=3306):
     * [user] user name for sql authorization, default is root
     * [password] user password for sql authorization
     * [port] connection port, default is 3306, not requried
+    * [driver] mysql, sqlite or a registered driver, default is mysql
+    * [options] keyword arguments of the other drivers, see PySQLiteDriver.connect for sqlite
+
+    the connection is in autocommit mode, a statement is committed by the server
+    itself unless it runs in a transaction scope
     
     @Returns:
     * 【connection] to the database
     """
+    if driver != "mysql":
+        connect_func = _drivers.get(driver)
+        if connect_func is None:
+            raise InvalidParamException(f"unknown driver[{driver}]")
+        return connect_func(**options)
+
     res, null_keys = check_null_params(user=user, password=password, host=host, port=port)
 
     if res is True:
@@ -45,6 +116,7 @@ def connect(password, user="root", host="127.0.0.1", port=3306):
         password=password,
         port=port,
         charset="UTF8",
+        autocommit=True,
         cursorclass=pymysql.cursors.DictCursor)
     return connection
 
@@ -86,64 +158,451 @@ def check_connection(connection):
         return False
 
 
-def execute(connection, statement):
+def is_alive(connection):
+    """
+    Check a connection answers a ping, without reconnecting a broken one in place,
+    so a pool can replace it and count the reconnect
+
+    @Args:
+    * [connection] if connection is alive return True
+
+    @Returns:
+    * [bool]
+    """
+    try:
+        connection.ping(False)
+        return True
+    except Exception:
+        return False
+
+
+def is_open(connection):
+    """
+    Check a connection is not closed, this is a local check without
+    any round trip to server
+
+    @Args:
+    * [connection] if connection is not closed return True
+
+    @Returns:
+    * [bool]
+    """
+    return connection is not None and connection.open
+
+
+def in_transaction(connection):
+    """
+    Check a transaction scope is open on the connection
+
+    @Args:
+    * [connection] connector
+
+    @Returns:
+    * [bool]
+    """
+    return connection in _transactions
+
+
+def on_commit(connection, func):
+    """
+    call func() once the statements executed on the connection are committed,
+    at once if no transaction scope is open, else after the scope commits. the
+    call is dropped if the scope rolls back
+
+    @Args:
+    * [connection] connector
+    * [func] function without arguments
+    """
+    if connection in _transactions:
+        _after_commit.setdefault(connection, []).append(func)
+    else:
+        func()
+
+
+def _commit(connection):
+    """
+    commit a statement, unless a transaction scope is open on the connection or
+    the server commits by itself in autocommit mode
+    """
+    if connection in _transactions or connection.get_autocommit():
+        return
+    connection.commit()
+
+
+@contextmanager
+def transaction(connection):
+    """
+    Unit of work on a connection, the statements executed in the scope are committed
+    once at the end, or rolled back if an exception is raised. nested scopes join the
+    outermost one.
+
+    Usage:
+    with transaction(conn):
+        execute(conn, "UPDATE ...", args)
+        execute(conn, "INSERT ...", args)
+
+    @Args:
+    * [connection] connector
+    """
+    if connection in _transactions:  # join the outer scope
+        _transactions[connection] += 1
+        try:
+            yield connection
+        finally:
+            _transactions[connection] -= 1
+        return
+
+    connection.begin()
+    _transactions[connection] = 1
+    try:
+        yield connection
+    except BaseException:
+        del _transactions[connection]
+        _after_commit.pop(connection, None)
+        try:
+            connection.rollback()
+        except Exception:  # broken connection, the server rolls back when it is dropped
+            pass
+        raise
+    else:
+        del _transactions[connection]
+        funcs = _after_commit.pop(connection, ())
+        connection.commit()
+        for func in funcs:
+            func()
+
+
+def add_listener(listener):
+    """
+    call listener after every statement executed by this module
+
+    listener(connection, statement, args, seconds, error), seconds is measured with a
+    monotonic clock around the execution of statement, error is the exception raised
+    or None. a listener runs on the thread of the statement, so it should be quick,
+    and its exceptions are ignored.
+
+    @Args:
+    * [listener] function
+    """
+    global _listeners
+    if listener not in _listeners:
+        _listeners = _listeners + (listener,)
+
+
+def remove_listener(listener):
+    """
+    stop calling listener
+
+    @Args:
+    * [listener] function
+    """
+    global _listeners
+    _listeners = tuple([func for func in _listeners if func != listener])
+
+
+@contextmanager
+def unlistened():
+    """
+    the statements of the current thread in the scope are not passed to the listeners,
+    for the statements the tools around the listeners run themselves, such as EXPLAIN
+
+    Usage:
+    with PySQLConnection.unlistened():
+        PySQLConnection.query(conn, "EXPLAIN " + statement, args)
+    """
+    depth = getattr(_unlistened, "depth", 0)
+    _unlistened.depth = depth + 1
+    try:
+        yield
+    finally:
+        _unlistened.depth = depth
+
+
+def _timed_execute(connection, cursor, statement, args=None):
+    """
+    cursor.execute, timed for the listeners if there are any
+    """
+    if not _listeners or getattr(_unlistened, "depth", 0):
+        return cursor.execute(statement, args)
+
+    error = None
+    started = time.perf_counter()
+    try:
+        return cursor.execute(statement, args)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        for listener in _listeners:
+            try:
+                listener(connection, statement, args, seconds, error)
+            except Exception:  # a broken listener must not fail the statement
+                pass
+
+
+class TupleResult(object):
+    """
+    rows as tuples, with the column names shared by all the rows
+    """
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def index(self, column):
+        """
+        Returns:
+        * [int] the position of column in a row
+        """
+        return self.columns.index(column)
+
+    def column(self, column):
+        """
+        Returns:
+        * [list] values of column
+        """
+        i = self.columns.index(column)
+        return [row[i] for row in self.rows]
+
+
+@lru_cache(maxsize=256)
+def _row_class(columns):
+    """
+    a row class with __slots__ for a header, column names that are not identifiers,
+    such as COUNT(*), have the other characters replaced by _
+    """
+    names = []
+    for column in columns:
+        name = re.sub(r"\W", "_", column)
+        if not name or name[0].isdigit():
+            name = "_" + name
+        while name in names:  # the same column of two tables
+            name += "_"
+        names.append(name)
+    names = tuple(names)
+
+    def __init__(self, values):
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return "Row(" + ", ".join([f"{name}={getattr(self, name)!r}" for name in names]) + ")"
+
+    return type("Row", (object,), {"__slots__": names, "_fields": names, "__init__": __init__,
+                                   "__repr__": __repr__})
+
+
+def _shape(columns, rows, result):
+    """
+    rows of tuples in the result format
+    """
+    if result == TUPLE:
+        return TupleResult(columns, rows)
+
+    if result == SLOTS:
+        row_class = _row_class(columns)
+        return [row_class(row) for row in rows]
+
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    if numpy is not None:
+        return {column: numpy.array(value) for column, value in zip(columns, values)}
+    return {column: list(value) for column, value in zip(columns, values)}
+
+
+def _check_format(result):
+    if result not in _FORMATS:
+        raise InvalidParamException(f"result must be one of {', '.join(_FORMATS)}")
+
+
+def execute(connection, statement, args=None):
     """
     execute sql command
     
     @Args:
     * [connection]
-    * [statement]
+    * [statement] str, values can be %s placeholders
+    * [args] tuple or list, values bound to the placeholders, default is None
 
     @Returns:
     * [int] depends on how many rows are affected
     """
     with connection.cursor() as cursor:
-        rows = cursor.execute(statement)
-        connection.commit()
+        rows = _timed_execute(connection, cursor, statement, args)
+        _commit(connection)
         return rows
 
 
-def query(connection, statement):
+def query(connection, statement, args=None, result=DICT):
     """
     query sql command
     
     @Args:
     * [connection] connector
-    * [statement] str
+    * [statement] str, values can be %s placeholders
+    * [args] tuple or list, values bound to the placeholders, default is None
+    * [result] DICT, TUPLE, SLOTS or COLUMNS, the format of rows, default is DICT
 
     @Returns:
-    * [any] could be None, dict, list, depending on how many rows returned
+    * [any] for DICT, could be None, dict, list, depending on how many rows returned,
+        for the other formats, all the rows in the format whatever how many they are
     """
+    if result != DICT:
+        _check_format(result)
+        with connection.cursor(pymysql.cursors.Cursor) as cursor:
+            _timed_execute(connection, cursor, statement, args)
+            res = _shape(tuple([d[0] for d in cursor.description]), cursor.fetchall(), result)
+            _commit(connection)
+            return res
+
     with connection.cursor() as cursor:
-        rows = cursor.execute(statement)
+        rows = _timed_execute(connection, cursor, statement, args)
         res = None
         if rows > 1:
             res = cursor.fetchall()
         if rows == 1:
             res = cursor.fetchone()
-        connection.commit()
+        _commit(connection)
         return res
 
 
-def multi_execute(connection, statement, varbs):
+def stream_query(connection, statement, args=None, chunk_size=1000, result=DICT):
+    """
+    query sql command with an unbuffered server side cursor, rows are read from the
+    server chunk by chunk, so a large result runs in constant memory
+
+    Usage:
+    for rows in stream_query(conn, "SELECT * FROM `db`.`table`"):
+        for row in rows:
+            ...
+
+    the connection cannot be used for anything else until the generator is exhausted
+    or closed, closing it early still reads the rest of the result from the server
+
+    @Args:
+    * [connection] connector
+    * [statement] str, values can be %s placeholders
+    * [args] tuple or list, values bound to the placeholders, default is None
+    * [chunk_size] int, the number of rows fetched at a time, default is 1000
+    * [result] DICT, TUPLE, SLOTS or COLUMNS, the format of rows, default is DICT
+
+    @Returns:
+    * [generator] at most chunk_size rows each, never empty, list of dict for DICT,
+        or the rows in the format as query returns
+    """
+    _check_format(result)
+
+    if result == DICT:
+        with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            _timed_execute(connection, cursor, statement, args)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+    else:
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            _timed_execute(connection, cursor, statement, args)
+            columns = tuple([d[0] for d in cursor.description])
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield _shape(columns, rows, result)
+    _commit(connection)
+
+
+def max_allowed_packet(connection):
+    """
+    the max_allowed_packet of server, a statement larger than this is refused
+
+    @Args:
+    * [connection] connector
+
+    @Returns:
+    * [int] bytes
+    """
+    return int(query(connection, "SELECT @@max_allowed_packet AS `packet`")["packet"])
+
+
+def _bulk_execute(connection, prefix, values, postfix, varbs, max_packet):
+    """
+    join the value groups of varbs into multi-row statements, each one smaller than
+    max_packet, and commit after each statement
+    """
+    if max_packet is None:
+        max_packet = _packets.get(connection)
+        if max_packet is None:
+            max_packet = _packets[connection] = max_allowed_packet(connection)
+    limit = max_packet - _PACKET_HEADROOM
+
+    encoding = connection.encoding
+    fixed = len(prefix.encode(encoding)) + len(postfix.encode(encoding))
+
+    with connection.cursor() as cursor:
+        rows = 0
+        chunk, size = [], fixed
+        for var in varbs:
+            value = cursor.mogrify(values, var)
+            length = len(value.encode(encoding)) + 1  # with the comma
+
+            if chunk and size + length > limit:
+                rows += _timed_execute(connection, cursor, prefix + ",".join(chunk) + postfix)
+                _commit(connection)
+                chunk, size = [], fixed
+
+            chunk.append(value)
+            size += length
+
+        if chunk:
+            rows += _timed_execute(connection, cursor, prefix + ",".join(chunk) + postfix)
+            _commit(connection)
+        return rows
+
+
+def multi_execute(connection, statement, varbs, max_packet=None):
     """
     execute multi-commands
 
     Usage:
-    multi_execute(conn, "insert into table (key1, key2, key3, ...) values (% % % %)"), varbs)
+    multi_execute(conn, "insert into table (key1, key2, key3, ...) values (%s, %s, %s, ...)", varbs)
     the 'varbs' is a list of [[val1, val2, val3, ...], [val1, val2, val3, ...]]
 
+    an INSERT or REPLACE ... VALUES statement is sent as multi-row statements,
+    (...), (...), ..., each one under max_allowed_packet of server and committed on
+    its own, so a failure leaves the chunks before it in the table, unless it runs
+    in a transaction scope. any other statement is executed once per row, and
+    each row is committed on its own as the connection is in autocommit mode,
+    unless it runs in a transaction scope.
+
     @Args:
     * [connection] pymysql.connection
     * [statement] str, template
     * [varbs] list
+    * [max_packet] int, bytes a multi-row statement may take, default is max_allowed_packet of server,
+        asked once per connection
 
     @Returns:
     * [int] depends on how many rows are affected
     """
+    matched = RE_INSERT_VALUES.match(statement)
+    if matched is not None:
+        return _bulk_execute(connection, matched.group(1) % (), matched.group(2).rstrip(), matched.group(3) or "",
+                             varbs, max_packet)
+
     with connection.cursor() as cursor:
         rows = 0
         for var in varbs:
-            rows += cursor.execute(statement, var)
-        connection.commit()
+            rows += _timed_execute(connection, cursor, statement, var)
+        _commit(connection)
         return rows
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import json
+import queue
+import threading
+import time
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PySQLPool import PySQLPool
+from matsuki.pysql.PySQLProfiler import PySQLProfiler
+from siki.basics.Logger import Logger
+from siki.basics.Logger import Priority
+from siki.basics import Exceptions
+
+
+def check_plan(plan):
+    """
+    problems of an EXPLAIN result
+
+    Args:
+    * [plan] list of rows of EXPLAIN
+
+    Returns:
+    * [list] str, such as "full scan of `users`", empty if nothing was found
+    """
+    flags = []
+    for row in plan:
+        table = row.get("table")
+        access = row.get("type")
+        extra = row.get("Extra") or ""
+
+        if access == "ALL":
+            flags.append(f"full scan of `{table}`")
+        elif access == "index":
+            flags.append(f"full index scan of `{table}`")
+        if row.get("possible_keys") is None and access in ("ALL", "index"):
+            flags.append(f"no usable index on `{table}`")
+        if "Using filesort" in extra:
+            flags.append(f"filesort on `{table}`")
+        if "Using temporary" in extra:
+            flags.append(f"temporary table on `{table}`")
+    return flags
+
+
+class PySQLExplainer(threading.Thread):
+
+    def __init__(self, pool: PySQLPool, profiler: PySQLProfiler, params: dict = None):
+        """
+        run EXPLAIN once for every shape of slow SELECT statements reported by the
+        profiler, on a spare connection of pool and on its own thread, so the request
+        path only queues the statement. plans with full scans, filesorts or temporary
+        tables are logged, and all plans are kept in a report.
+
+        Usage:
+        explainer = PySQLExplainer(pool, profiler)
+        explainer.start()
+        ...
+        explainer.dump("explain.json")
+
+        Args:
+        * [pool] PySQLPool, a pool to the same server, better a replica
+        * [profiler] PySQLProfiler, its slow_threshold decides what is explained
+        * [params] bstd, blog, dir, fname,
+            max_pending (statements waiting to be explained, the others are dropped, default is 100),
+            max_shapes (shapes kept in the report, default is 1000),
+            checkout_timeout (seconds to wait for a connection, default is 1)
+        """
+        if not isinstance(pool, PySQLPool):
+            raise Exceptions.InvalidParamException("pool must be a PySQLPool")
+
+        threading.Thread.__init__(self, name="PySQLExplainer", daemon=True)
+
+        params = params or {}
+
+        self.pool = pool
+        self.pending = queue.Queue(maxsize=int(params.get('max_pending', 100)))
+        self.max_shapes = int(params.get('max_shapes', 1000))
+        self.timeout = float(params.get('checkout_timeout', 1))
+        self.lock = threading.Lock()
+        self.seen = set()  # shapes queued or explained
+        self.reports = {}  # shape -> dict
+        self.stopped = threading.Event()
+
+        # init with configure file
+        if 'bstd' in params.keys() and 'blog' in params.keys() \
+                and 'dir' in params.keys() and 'fname' in params.keys():
+            self.logger = Logger(bool(params['bstd']), bool(params['blog']), params['dir'], params['fname'])
+        else:
+            self.logger = Logger(True, False)
+
+        profiler.add_slow_listener(self.on_slow)
+
+    def on_slow(self, connection, statement, args, seconds, shape):
+        """
+        slow listener of the profiler, queues the first statement of a shape
+        """
+        if isinstance(statement, (bytes, bytearray)) or not statement.lstrip()[:6].upper() == "SELECT":
+            return
+
+        with self.lock:
+            if shape in self.seen or len(self.seen) >= self.max_shapes:
+                return
+            self.seen.add(shape)
+
+        try:
+            self.pending.put_nowait((statement, args, seconds, shape))
+        except queue.Full:  # try again with a later statement of the shape
+            with self.lock:
+                self.seen.discard(shape)
+
+    def run(self):
+        while not self.stopped.is_set():
+            item = self.pending.get()
+            if item is None:
+                break
+            self.explain(*item)
+
+    def stop(self):
+        """
+        stop the thread, the statements pending are dropped
+        """
+        self.stopped.set()
+        try:
+            self.pending.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def explain(self, statement, args, seconds, shape):
+        """
+        explain a statement and keep its report
+        """
+        # only a spare connection, the requests go first
+        conn = self.pool.get_connection(self.timeout) if self.pool.size() > 0 else None
+        if conn is None:
+            with self.lock:
+                self.seen.discard(shape)
+            return
+
+        try:  # not profiled nor captured, a replay must not run it again
+            with PySQLConnection.unlistened():
+                plan = PySQLConnection.query(conn, "EXPLAIN " + statement, args)
+        except Exception as e:
+            self.logger.message(Priority.ERROR, msg=f"explain failed: {shape}", exception=e)
+            plan = None
+        finally:
+            self.pool.put_connection(conn)
+
+        if plan is None:
+            plan = []
+        elif isinstance(plan, dict):  # only one row returned
+            plan = [plan]
+
+        flags = check_plan(plan)
+        with self.lock:
+            self.reports[shape] = {
+                "shape": shape,
+                "statement": statement,
+                "seconds": seconds,
+                "explained_at": time.time(),
+                "plan": plan,
+                "flags": flags,
+            }
+
+        if flags:
+            self.logger.message(Priority.INFO, msg=f"slow query {seconds * 1000:.1f}ms, {', '.join(flags)}: {shape}")
+
+    def report(self, flagged: bool = False):
+        """
+        the plans explained, the slowest first
+
+        Args:
+        * [flagged] only the plans with problems, default is False
+
+        Returns:
+        * [list] dicts with shape, statement, seconds, explained_at, plan and flags
+        """
+        with self.lock:
+            reports = list(self.reports.values())
+
+        if flagged:
+            reports = [item for item in reports if item["flags"]]
+        reports.sort(key=lambda item: item["seconds"], reverse=True)
+        return reports
+
+    def dump(self, path: str = None, flagged: bool = False):
+        """
+        the report as json
+
+        Args:
+        * [path] file to write, default is None, the json is returned only
+        * [flagged] only the plans with problems, default is False
+
+        Returns:
+        * [str] json
+        """
+        text = json.dumps(self.report(flagged), indent=2, default=str)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
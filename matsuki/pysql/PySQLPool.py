@@ -1,16 +1,54 @@
 # -*- coding: utf-8 -*-
 # Author: Orlando Chen
 # Create: Sep 15, 2018
-# Modified: Mar 17, 2020
+# Modified: Oct 18, 2026
 
+from matsuki.MatsukiCode import Code
 from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PySQLStats import PoolStats
+from matsuki.pysql import PyScopedConnection
 from siki.basics.Logger import Logger
 from siki.basics.Logger import Priority
 from siki.basics import Exceptions
-from siki.dstruct.Queue import Queue
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import random
 import time
 import threading
+import traceback
+
+
+# states of the circuit breaker
+BREAKER_CLOSED = 0
+BREAKER_OPEN = 1
+BREAKER_HALF_OPEN = 2
+
+
+class PySQLPoolException(Exceptions.SQLConnectionException):
+    """
+    no connection could be drawn from pool, [code] tells the reason
+    """
+
+    def __init__(self, msg: str, code: Code = Code.DATABASE_CONNECTION_ERROR):
+        Exceptions.SQLConnectionException.__init__(self, msg)
+        self.code = code
+
+
+class _ConnectionRecord(object):
+    """
+    bookkeeping for a connection owned by the pool
+    """
+
+    def __init__(self, conn, lifetime: float = 0):
+        self.conn = conn
+        self.idle = False
+        self.last_used = time.monotonic()  # last time the connection was known to be alive
+        self.expires_at = self.last_used + lifetime if lifetime > 0 else None
+        self.checkout_at = None  # when the connection was handed out, None if not in use
+        self.stack = None  # where the connection was handed out, with leak tracking only
+        self.leaked = False
 
 
 class PySQLPool(threading.Thread):
@@ -18,18 +56,100 @@ class PySQLPool(threading.Thread):
     def __init__(self, size: int, params: dict):
         """
         setting up a process pool for sql handling
-        
+
+        the pool never holds more than [size] connections, idle and checked out together,
+        a checkout beyond that waits on a condition variable until a connection is returned
+        or the checkout timeout expires. connecting and pinging always happen outside the
+        pool lock, so a slow server never stalls the other request threads.
+
+        a connection is only pinged at checkout when it has been idle longer than
+        validate_idle seconds. the background thread (start method) runs a maintenance
+        pass every maintenance_interval seconds, each pass handles at most
+        maintenance_batch connections of every task, taken out of the idle queue under
+        the lock and processed without it: connections older than max_lifetime are
+        recycled, with a random jitter so they do not all expire at once, connections
+        idle longer than idle_timeout are closed while the pool has more than min_idle
+        idle ones, long idle connections are validated and the idle floor is made up.
+
+        at startup the first min_idle connections are opened concurrently, the others up
+        to warmup_size are opened one by one in background. with warmup set to lazy the
+        constructor returns at once and the idle floor is opened in background as well,
+        use is_ready or wait_ready to know when the idle floor is available.
+
+        checkout wait, hold time, utilization and connection events are recorded under
+        the pool lock into fixed bucket histograms, see stats.
+
+        with leak_threshold set, the stack of every checkout is kept, and connections held
+        longer than that are logged with their checkout stack by the background thread.
+        with leak_reclaim they are also closed and their slots given back to the pool.
+
+        after breaker_threshold consecutive connect failures the circuit breaker opens and
+        every checkout fails at once instead of waiting for a tcp timeout. breaker_reset
+        seconds later one checkout is let through as a trial, the breaker closes if it
+        connects and opens again if it fails.
+
         Args:
-        * [size] the number of sql connections to keep
-        * [params] user, password, host, port, db, bstd, blog, dir, fname
+        * [size] the maximum number of sql connections to keep
+        * [params] user, password, host, port, db, bstd, blog, dir, fname,
+            min_idle (connections kept open, default is size),
+            checkout_timeout (seconds to wait for a free connection, default is 30),
+            validate_idle (idle seconds before a connection is pinged again, default is 30),
+            maintenance_interval (seconds between maintenance passes, default is 5),
+            maintenance_batch (connections handled by each task of a pass, default is 4),
+            max_lifetime (seconds before a connection is recycled, default is 1800, 0 means forever),
+            lifetime_jitter (ratio of max_lifetime taken off at random, default is 0.1),
+            idle_timeout (idle seconds before a connection above min_idle is closed, default is 600),
+            warmup (eager or lazy, default is eager),
+            warmup_size (connections opened at startup, default is size),
+            warmup_workers (threads opening connections at startup, default is 8),
+            leak_threshold (seconds a connection may be held before reported as leaked,
+                default is 0, no leak tracking),
+            leak_reclaim (close leaked connections and free their slots, default is False),
+            breaker_threshold (consecutive connect failures that open the circuit breaker,
+                default is 5, 0 means no breaker),
+            breaker_reset (seconds before an open breaker lets a trial checkout through, default is 10),
+            driver (mysql, sqlite or a driver registered to PySQLConnection, default is mysql),
+            driver_options (dict, keyword arguments of a driver other than mysql,
+                such as {'database': ':memory:'} for sqlite)
         """
         threading.Thread.__init__(self)
 
         # assign values
-        self.pool = Queue()
+        self.pool = deque()  # idle connections, the most recently returned one is reused first
+        self.records = {}  # id(conn) -> _ConnectionRecord, every connection owned by the pool
         self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
         self.params = params
 
+        self.max_size = max(int(size), 1)
+        self.min_idle = min(int(params.get('min_idle', self.max_size)), self.max_size)
+        self.timeout = float(params.get('checkout_timeout', 30))
+        self.validate_idle = float(params.get('validate_idle', 30))
+        self.maintenance_interval = float(params.get('maintenance_interval', 5))
+        self.maintenance_batch = max(int(params.get('maintenance_batch', 4)), 1)
+        self.max_lifetime = float(params.get('max_lifetime', 1800))
+        self.lifetime_jitter = min(max(float(params.get('lifetime_jitter', 0.1)), 0), 1)
+        self.idle_timeout = float(params.get('idle_timeout', 600))
+        self.total = 0  # connections opened or being opened, never exceeds max_size
+        self.in_use = 0  # connections handed out to callers
+        self.waiting = 0  # callers waiting for a free connection
+        self.metrics = PoolStats()
+        self.closed = False
+        self.stopped = threading.Event()
+        self.ready = threading.Event()
+
+        self.warmup_size = min(int(params.get('warmup_size', self.max_size)), self.max_size)
+        self.warmup_workers = max(int(params.get('warmup_workers', 8)), 1)
+        self.leak_threshold = float(params.get('leak_threshold', 0))
+        self.leak_reclaim = bool(params.get('leak_reclaim', False))
+
+        self.breaker_threshold = int(params.get('breaker_threshold', 5))
+        self.breaker_reset = float(params.get('breaker_reset', 10))
+        self.breaker_state = BREAKER_CLOSED
+        self.breaker_failures = 0  # consecutive connect failures
+        self.breaker_opened_at = None
+        self.breaker_probing = False  # a trial checkout is in flight
+
         # init with configure file
         if 'bstd' in params.keys() and 'blog' in params.keys() \
                 and 'dir' in params.keys() and 'fname' in params.keys():
@@ -37,174 +157,670 @@ class PySQLPool(threading.Thread):
         else:
             self.logger = Logger(True, False)
 
-        try:
-            for i in range(size):
-                # create a connection to sql server
-                conn = PySQLConnection.connect(user=params['user'],
-                                               password=params['password'],
-                                               host=params['host'],
-                                               port=params['port'])
-
-                # add connection to queue
-                self.pool.enqueue(conn)
+        # open the idle floor now, or leave everything to the warmup thread
+        if params.get('warmup', 'eager') != 'lazy':
+            self._fill(self.min_idle, self.warmup_workers)
+            self.ready.set()
 
             # print debug message
             self.logger.message(Priority.INFO, msg="creating connections pool finished")
 
-        except Exceptions.SQLConnectionException as e:
-            self.logger.message(Priority.ERROR, msg="creating connection failed", exception=e)
+        threading.Thread(target=self._warmup, name="PySQLPool-warmup", daemon=True).start()
 
     def run(self):
         """
-        threading.Thread method, when start method called, this 
+        threading.Thread method, when start method called, this
         threading method will automatically run by self in every
-        60 seconds
+        maintenance_interval seconds until the pool is closed
+        """
+        while not self.stopped.wait(self.maintenance_interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                self.logger.message(Priority.ERROR, msg="pool maintenance failed", exception=e)
+
+    def maintain(self):
+        """
+        One maintenance pass, checkouts keep working while it runs since no
+        connection is closed, pinged or opened with the lock held
         """
-        while True:
-            # sleeping for 30 minutes
-            time.sleep(60 * 30)
+        # recycle old connections and shrink the pool after a traffic spike
+        self.retire()
+
+        # validate long idle connections
+        self.validate()
+
+        # report connections never put back
+        if self.leak_threshold > 0:
+            self.check_leaks()
 
-            # refresh the pool
-            self.refresh()
+        # make up the idle floor
+        self._fill(self.min_idle, limit=self.maintenance_batch)
 
-    def get_connection(self):
+    def _warmup(self):
         """
-        Draw a connection from pool
+        open the idle floor if the pool starts lazily, then grow the pool to
+        warmup_size one connection at a time, so that checkouts always find a free slot
+        """
+        if not self.ready.is_set():
+            opened = self._fill(self.min_idle, self.warmup_workers)
+            self.ready.set()
+            self.logger.message(Priority.INFO, msg="pool ready, {} connections opened".format(opened))
+
+        while not self.closed:
+            with self.lock:
+                if self.total >= self.warmup_size:
+                    break
+                self.total += 1
+
+            conn = self._open_reserved()
+            if conn is None:  # server not reachable, leave it to checkouts
+                break
+            self._checkin(conn)
+
+    def is_ready(self):
+        """
+        Whether the idle floor of the pool has been opened
         Returns:
-        * [conn] pymysql.connect, the connection object from pool
+        * [res] bool
         """
-        conn = None
-        try:
-            self.lock.acquire()
-
-            # returns a conn instance
-            if len(self.pool) > 0:
-                conn = self.pool.dequeue()
+        return self.ready.is_set()
 
-            # if connection is empty
-            if conn is None:
-                self.logger.message(Priority.INFO, msg="connection is none, create a new one")
-                conn = PySQLConnection.connect(
-                    user=self.params['user'],
-                    password=self.params['password'],
-                    host=self.params['host'],
-                    port=self.params['port'])
+    def wait_ready(self, timeout: float = None):
+        """
+        Block until the idle floor of the pool has been opened
+        Args:
+        * [timeout] seconds to wait, default is None, wait forever
 
-            # if not connected
-            if not PySQLConnection.check_connection(conn):
-                PySQLConnection.reconnect(conn)
+        Returns:
+        * [res] bool, False if timeout
+        """
+        return self.ready.wait(timeout)
 
-        except Exception as e:
-            self.logger.message(Priority.ERROR, msg="get connection failed", exception=e)
+    def _connect(self):
+        """
+        open a new connection with the pool parameters
+        """
+        driver = self.params.get('driver', 'mysql')
+        if driver != 'mysql':
+            return PySQLConnection.connect(driver=driver, **self.params.get('driver_options', {}))
 
-        finally:
-            self.lock.release()
-            return conn
+        return PySQLConnection.connect(user=self.params['user'],
+                                       password=self.params['password'],
+                                       host=self.params['host'],
+                                       port=self.params['port'])
 
-    def put_connection(self, conn):
+    def _open_reserved(self, checkout=False):
         """
-        Put a connection back to pool
+        open a connection for a slot already reserved in self.total,
+        the slot is given back if the server cannot be reached
+
         Args:
-        * [conn] pymysql.connect
+        * [checkout] bool, the connection is handed out to a caller
+
+        Returns:
+        * [conn] pymysql.connect, or None if failed
         """
+        started = time.monotonic()
         try:
-            self.lock.acquire()
+            conn = self._connect()
+        except Exception as e:
+            with self.available:
+                self.metrics.connect_failures += 1
+                self.total -= 1
+                self.available.notify()
+                opened = self._breaker_result(False)
+            self.logger.message(Priority.ERROR, msg="create connection failed", exception=e)
+            if opened:
+                self.logger.message(Priority.ERROR, msg="circuit breaker opened after {} connect failures".format(
+                    self.breaker_failures))
+            return None
+
+        lifetime = self.max_lifetime * (1 - random.random() * self.lifetime_jitter)
+        with self.lock:
+            now = time.monotonic()
+            record = _ConnectionRecord(conn, lifetime)
+            self.records[id(conn)] = record
+            self.metrics.connects += 1
+            self.metrics.connect_time.observe(now - started)
+            if checkout:
+                self._mark_checkout(record, now)
+            recovered = self._breaker_result(True)
+
+        if recovered:
+            self.logger.message(Priority.INFO, msg="circuit breaker closed, database is reachable again")
+        return conn
+
+    def _breaker_result(self, success: bool):
+        """
+        feed a connect or trial result to the circuit breaker, called with the lock held
+
+        Returns:
+        * [bool] True if the breaker changed between closed and open
+        """
+        if self.breaker_threshold <= 0:
+            return False
+
+        self.breaker_probing = False
+
+        if success:
+            self.breaker_failures = 0
+            if self.breaker_state != BREAKER_CLOSED:
+                self.breaker_state = BREAKER_CLOSED
+                return True
+            return False
+
+        self.breaker_failures += 1
+        if self.breaker_state == BREAKER_HALF_OPEN or \
+                (self.breaker_state == BREAKER_CLOSED and self.breaker_failures >= self.breaker_threshold):
+            changed = self.breaker_state == BREAKER_CLOSED
+            self.breaker_state = BREAKER_OPEN
+            self.breaker_opened_at = time.monotonic()
+            return changed
+        return False
+
+    def _breaker_admit(self, now: float):
+        """
+        whether a checkout may go on while the breaker is not closed, the first
+        checkout after breaker_reset seconds becomes the trial, called with the lock held
+        """
+        if self.breaker_state == BREAKER_OPEN and now - self.breaker_opened_at >= self.breaker_reset:
+            self.breaker_state = BREAKER_HALF_OPEN
+
+        if self.breaker_state == BREAKER_HALF_OPEN and not self.breaker_probing:
+            self.breaker_probing = True
+            return True
 
-            # valid connection, put it back to pool
-            if conn and PySQLConnection.check_connection(conn):
-                self.pool.enqueue(conn)
+        return False
+
+    def _mark_checkout(self, record, now):
+        """
+        account a connection handed out to a caller, called with the lock held
+        """
+        record.checkout_at = now
+        self.in_use += 1
+        self.metrics.checkouts += 1
+        self.metrics.utilization.observe(self.in_use / self.max_size)
+
+    def _forget(self, conn):
+        """
+        remove the record of a connection, called with the lock held
+        """
+        record = self.records.pop(id(conn), None)
+        if record is not None and record.checkout_at is not None:
+            self.in_use -= 1
+
+    def _release_slot(self, conn=None):
+        """
+        forget a connection and free its slot for a waiting checkout
+        """
+        with self.available:
+            if conn is not None:
+                self._forget(conn)
+            self.total -= 1
+            self.available.notify()
+
+    def _discard(self, conn, keep_slot=False):
+        """
+        drop a broken connection from the pool, with [keep_slot] the caller
+        reuses the slot for a replacement connection
+        """
+        if keep_slot:
+            with self.lock:
+                self._forget(conn)
+        else:
+            self._release_slot(conn)
+
+        try:
+            PySQLConnection.disconnect(conn)
+        except Exception:
+            pass
 
-            # none connection, create a new one then re-enqueue
+    def _checkin(self, conn):
+        """
+        put an owned connection back to the idle queue, wake up one waiter
+        """
+        with self.available:
+            record = self.records.get(id(conn))
+
+            # foreign or already returned connection
+            if record is None or record.idle:
+                return False
+
+            now = time.monotonic()
+            if record.checkout_at is not None:
+                self.metrics.hold_time.observe(now - record.checkout_at)
+                record.checkout_at = None
+                record.stack = None
+                record.leaked = False
+                self.in_use -= 1
+
+            # closed pool or connection past its lifetime
+            expired = record.expires_at is not None and now >= record.expires_at
+            if self.closed or expired:
+                self.records.pop(id(conn))
+                self.total -= 1
+                if expired:
+                    self.metrics.expired += 1
+                self.available.notify()
+                closing = True
             else:
-                conn = PySQLConnection.connect(
-                    user=self.params['user'],
-                    password=self.params['password'],
-                    host=self.params['host'],
-                    port=self.params['port'])
-                self.logger.message(Priority.INFO, msg="create a new connection to pool")
+                record.idle = True
+                record.last_used = now
+                self.pool.append(conn)
+                self.available.notify()
+                closing = False
+
+        if closing:
+            try:
+                PySQLConnection.disconnect(conn)
+            except Exception:
+                pass
+        return True
+
+    def _fill(self, target: int, workers: int = 1, limit: int = None):
+        """
+        open connections until there are at least [target] idle ones, at most [limit]
+        of them, with more than one worker the connections are opened concurrently
+        """
+        with self.lock:
+            missing = min(target - len(self.pool), self.max_size - self.total)
+            if limit is not None:
+                missing = min(missing, limit)
+            if missing <= 0 or self.closed or self.breaker_state != BREAKER_CLOSED:
+                return 0
+            self.total += missing
 
-                # enqueue
-                self.put_connection(conn)
+        def open_one(i):
+            conn = self._open_reserved()
+            return conn is not None and self._checkin(conn)
 
-        finally:
-            self.lock.release()
+        if workers > 1 and missing > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, missing)) as executor:
+                return sum(executor.map(open_one, range(missing)))
 
-    def is_empty(self):
+        return sum(open_one(i) for i in range(missing))
+
+    def get_connection(self, timeout: float = None, raise_error: bool = False):
         """
-        Whether the pool is empty
+        Draw a connection from pool, if all connections are in use and the pool
+        reached its maximum size, wait until one is returned. while the circuit
+        breaker is open, fail at once.
+
+        Args:
+        * [timeout] seconds to wait for a free connection, default is the pool checkout_timeout
+        * [raise_error] raise PySQLPoolException instead of returning None if failed
+
         Returns:
-        * [res] bool
+        * [conn] pymysql.connect, the connection object from pool, None if failed
         """
-        try:
-            self.lock.acquire()
+        if timeout is None:
+            timeout = self.timeout
+
+        started = time.monotonic()
+        conn = None
+        deadline = None
+        failure = None
+        probe = False
+
+        with self.available:
+            while True:
+                if self.closed:
+                    failure = "get connection from a closed pool"
+                    break
+
+                # database unreachable, fail fast
+                if self.breaker_state != BREAKER_CLOSED and not probe:
+                    probe = self._breaker_admit(time.monotonic())
+                    if not probe:
+                        self.metrics.rejected += 1
+                        failure = "circuit breaker open, database is not reachable"
+                        break
+
+                # returns an idle conn instance
+                if len(self.pool) > 0:
+                    now = time.monotonic()
+                    conn = self.pool.pop()
+                    record = self.records[id(conn)]
+                    record.idle = False
+                    stale = probe or now - record.last_used > self.validate_idle
+                    self._mark_checkout(record, now)
+                    self.metrics.checkout_wait.observe(now - started)
+                    break
+
+                # room left, reserve a slot and connect outside the lock
+                if self.total < self.max_size:
+                    self.total += 1
+                    self.metrics.checkout_wait.observe(time.monotonic() - started)
+                    break
+
+                # pool exhausted, wait in queue
+                if deadline is None:
+                    deadline = started + timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.timeouts += 1
+                    failure = "get connection timeout, pool exhausted"
+                    break
+                self.waiting += 1
+                self.available.wait(remaining)
+                self.waiting -= 1
+
+            # the trial never reached the server, try again later
+            if failure is not None and probe:
+                self.breaker_probing = False
+                self.breaker_state = BREAKER_OPEN
+                self.breaker_opened_at = time.monotonic()
+
+        if failure is not None:
+            if self.breaker_state == BREAKER_CLOSED:  # no log flood while failing fast
+                self.logger.message(Priority.ERROR, msg=failure)
+            if raise_error:
+                raise PySQLPoolException(failure)
+            return None
+
+        # if connection is empty
+        if conn is None:
+            self.logger.message(Priority.INFO, msg="no idle connection, create a new one")
+            conn = self._open_reserved(checkout=True)
+
+        # idle for a long time and not connected, replace it in the same slot
+        elif stale and not PySQLConnection.is_alive(conn):
+            with self.lock:
+                self.metrics.failed_pings += 1
+                self.metrics.reconnects += 1
+            self._discard(conn, keep_slot=True)
+            conn = self._open_reserved(checkout=True)
+
+        # the trial connection answered
+        elif probe:
+            with self.lock:
+                recovered = self._breaker_result(True)
+            if recovered:
+                self.logger.message(Priority.INFO, msg="circuit breaker closed, database is reachable again")
+
+        if conn is None and raise_error:
+            raise PySQLPoolException("create connection failed")
+
+        # remember who holds the connection
+        if conn is not None and self.leak_threshold > 0:
+            record = self.records.get(id(conn))
+            if record is not None:
+                record.stack = traceback.extract_stack()[:-1]
+
+        return conn
+
+    def put_connection(self, conn):
+        """
+        Put a connection back to pool, no round trip to the server is made here
+        Args:
+        * [conn] pymysql.connect
+        """
+        if conn is None:
+            return
 
-            return self.pool.is_empty()
+        # closed connection, free its slot so that a new one can be created
+        if not PySQLConnection.is_open(conn):
+            with self.lock:
+                owned = id(conn) in self.records and not self.records[id(conn)].idle
+            if owned:
+                self._discard(conn)
+                self.logger.message(Priority.INFO, msg="drop a broken connection from pool")
+            return
 
-        finally:
-            self.lock.release()
+        self._checkin(conn)
 
-    def close(self):
+    def connection(self, timeout: float = None):
         """
-        Close the connection pool, this function will release all resources
+        Request scoped connection, nested scopes of the same request or thread
+        share one connection
+
+        Usage:
+        with pool.connection() as conn:
+            PySafeSQLCmd.safe_query_id(conn, db, table, item_id)
+
+        Args:
+        * [timeout] seconds to wait for a free connection, default is the pool checkout_timeout
+
+        Returns:
+        * [ScopedConnection] context manager yields pymysql.connect
         """
-        try:
-            self.lock.acquire()
+        return PyScopedConnection.ScopedConnection(self, timeout)
+
+    def with_connection(self, func):
+        """
+        Decorator, run the function in a connection scope of this pool,
+        the connection is passed as the first argument, func(conn, *args, **kwargs)
+        """
+        return PyScopedConnection.with_connection(self)(func)
 
-            self.logger.message(Priority.INFO, msg="closing pool...")
+    def init_app(self, app):
+        """
+        Keep the connection of a flask request bound until the request is torn down,
+        so every scope opened during the request shares one connection
 
-            while not self.is_empty():
-                PySQLConnection.disconnect(self.pool.dequeue())
+        Args:
+        * [app] flask.Flask
+        """
+        PyScopedConnection.init_app(app, self)
 
-            self.logger.message(Priority.INFO, msg="PySQLPool colsed")
+    def is_empty(self):
+        """
+        Whether the pool is empty
+        Returns:
+        * [res] bool
+        """
+        with self.lock:
+            return len(self.pool) == 0
 
-        finally:
-            self.lock.release()
+    def close(self):
+        """
+        Close the connection pool, this function will release all resources,
+        connections still in use are closed when they are put back
+        """
+        self.logger.message(Priority.INFO, msg="closing pool...")
+        self.stopped.set()
+
+        with self.available:
+            self.closed = True
+            idle = list(self.pool)
+            self.pool.clear()
+            for conn in idle:
+                self._forget(conn)
+            self.total -= len(idle)
+            self.available.notify_all()
+
+        for conn in idle:
+            try:
+                PySQLConnection.disconnect(conn)
+            except Exception:
+                pass
+
+        self.logger.message(Priority.INFO, msg="PySQLPool colsed")
 
     def size(self):
         """
         Returning the size of pool
         Returns:
-        * [size] int, the size of contained connections
+        * [size] int, the number of idle connections
         """
-        try:
-            self.lock.acquire()
-            return self.pool.size()
-
-        finally:
-            self.lock.release()
+        with self.lock:
+            return len(self.pool)
 
     def refresh(self):
         """
         Refresh the connection pool, this function will fix broken connections.
+        idle connections are taken out of the pool and checked one by one without
+        holding the lock, so checkouts keep working during the sweep.
         """
-        try:
-            self.lock.acquire()
-            backup = []
+        with self.lock:
+            backup = list(self.pool)
+            self.pool.clear()
+            for conn in backup:
+                self.records[id(conn)].idle = False
+
+        broken = 0
+        for conn in backup:
+            # connection not works, drop it
+            if not PySQLConnection.is_alive(conn):
+                self._discard(conn)
+                broken += 1
+            else:
+                self._checkin(conn)
 
-            while not self.pool.is_empty():
-                conn = self.pool.dequeue()  # dequeue from pool
+        with self.lock:
+            self.metrics.failed_pings += broken
 
-                # an empty connection detected, reconnect to server
-                if conn is None:
-                    conn = PySQLConnection.connect(
-                        user=self.params['user'],
-                        password=self.params['password'],
-                        host=self.params['host'],
-                        port=self.params['port'])
+        # make up the idle floor
+        opened = self._fill(self.min_idle)
 
-                # connection not works, reconnect to server
-                if not PySQLConnection.check_connection(conn):
-                    PySQLConnection.reconnect(conn)
+        # refreshing pool
+        self.logger.message(Priority.INFO, msg="connections: {}/{}, refresing pool finished...".format(
+            len(backup) - broken + opened, self.max_size))
 
-                # append connection to queue
-                backup.append(conn)
+    def validate(self):
+        """
+        Ping at most maintenance_batch connections idle longer than validate_idle seconds,
+        broken ones are dropped and the idle floor is made up again. The longest idle
+        connections sit at the head of the idle queue, checkouts take from the tail.
+        """
+        with self.lock:
+            now = time.monotonic()
+            stale = []
+            while len(self.pool) > 0 and len(stale) < self.maintenance_batch:
+                record = self.records[id(self.pool[0])]
+                if now - record.last_used <= self.validate_idle:
+                    break
+                record.idle = False
+                stale.append(self.pool.popleft())
+
+        broken = 0
+        for conn in stale:
+            if PySQLConnection.is_alive(conn):
+                self._checkin(conn)
+            else:
+                self._discard(conn)
+                broken += 1
 
-            # after the loop, add new queue to original queue
-            self.pool.merge(backup)
+        if broken > 0:
+            with self.lock:
+                self.metrics.failed_pings += broken
+            self.logger.message(Priority.INFO, msg="{} broken connections dropped".format(broken))
+            self._fill(self.min_idle, limit=broken)
 
-            # refreshing pool
-            self.logger.message(Priority.INFO, msg="connections: {}/{}, refresing pool finished...".format(len(backup),
-                                                                                                           self.pool.size()))
+    def retire(self):
+        """
+        Close at most maintenance_batch idle connections past their lifetime and at
+        most maintenance_batch connections idle longer than idle_timeout, the latter
+        only while there are more than min_idle idle connections
 
-        finally:
-            self.lock.release()
+        Returns:
+        * [retired] int, the number of connections closed
+        """
+        with self.available:
+            now = time.monotonic()
+
+            # recycle expired connections wherever they are in the idle queue
+            expired = []
+            for conn in self.pool:
+                expires_at = self.records[id(conn)].expires_at
+                if expires_at is not None and now >= expires_at:
+                    expired.append(conn)
+                    if len(expired) >= self.maintenance_batch:
+                        break
+            for conn in expired:
+                self.pool.remove(conn)
+
+            # the longest idle connections are at the head of the queue
+            evicted = []
+            while len(self.pool) > self.min_idle and len(evicted) < self.maintenance_batch:
+                if now - self.records[id(self.pool[0])].last_used <= self.idle_timeout:
+                    break
+                evicted.append(self.pool.popleft())
+
+            retired = expired + evicted
+            for conn in retired:
+                self._forget(conn)
+            self.total -= len(retired)
+            self.metrics.expired += len(expired)
+            self.metrics.evicted += len(evicted)
+            self.available.notify(len(retired))
+
+        for conn in retired:
+            try:
+                PySQLConnection.disconnect(conn)
+            except Exception:
+                pass
+
+        # replace recycled connections, evicted ones are not needed any more
+        if len(expired) > 0:
+            self._fill(self.min_idle, limit=len(expired))
+
+        return len(retired)
+
+    def stats(self):
+        """
+        Snapshot of the pool state and its counters and histograms
+
+        Returns:
+        * [dict] max_size, min_idle, total, idle, in_use, waiting, breaker_state (0 closed,
+            1 open, 2 half open), breaker_failures, checkouts, timeouts, rejected,
+            connects, connect_failures, reconnects, failed_pings, leaks, reclaimed, expired, evicted, and the histograms
+            checkout_wait, connect_time, hold_time, utilization
+        """
+        with self.lock:
+            stats = {
+                "max_size": self.max_size,
+                "min_idle": self.min_idle,
+                "total": self.total,
+                "idle": len(self.pool),
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "breaker_state": self.breaker_state,
+                "breaker_failures": self.breaker_failures,
+            }
+            stats.update(self.metrics.snapshot())
+        return stats
+
+    def check_leaks(self):
+        """
+        Report the connections held longer than leak_threshold seconds with the stack
+        of their checkout, each leak is reported once. With leak_reclaim the leaked
+        connections are closed and their slots given back to the pool.
+
+        Returns:
+        * [leaks] int, the number of new leaks found
+        """
+        leaks = []
+        reclaimed = []
+
+        with self.available:
+            now = time.monotonic()
+            for record in list(self.records.values()):
+                if record.checkout_at is None or record.leaked \
+                        or now - record.checkout_at <= self.leak_threshold:
+                    continue
+
+                record.leaked = True
+                leaks.append((record, now - record.checkout_at))
+                self.metrics.leaks += 1
+
+                if self.leak_reclaim:
+                    self._forget(record.conn)
+                    self.total -= 1
+                    self.metrics.reclaimed += 1
+                    reclaimed.append(record.conn)
+                    self.available.notify()
+
+        for record, held in leaks:
+            stack = "".join(traceback.format_list(record.stack)) if record.stack else "unknown\n"
+            self.logger.message(Priority.ERROR, msg="connection held for {:.1f}s, checked out at:\n{}".format(
+                held, stack))
+
+        for conn in reclaimed:
+            try:
+                PySQLConnection.disconnect(conn)
+            except Exception:
+                pass
+
+        return len(leaks)
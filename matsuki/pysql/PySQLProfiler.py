@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import os
+import re
+import threading
+import time
+import traceback
+from functools import lru_cache
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PySQLStats import Histogram
+from matsuki.pysql.PySQLStats import LATENCY_BUCKETS
+from siki.basics.Logger import Logger
+from siki.basics.Logger import Priority
+
+# strings, hex and numbers, and the placeholders of bound values
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|\b0x[0-9A-Fa-f]+\b"
+                       r"|(?<![\w`$.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b|%s|%\(\w+\)s")
+
+# (?, ?, ...) lists, and the row lists of multi-row inserts
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+
+# WHEN ? THEN ? of bulk updates
+_CASES = re.compile(r"(?:WHEN \? THEN \?\s*){2,}", re.IGNORECASE)
+
+_SPACES = re.compile(r"\s+")
+
+# statements longer than this are normalized without caching, such as multi-row inserts
+_CACHED_LENGTH = 2048
+
+# frames of this package are skipped to find the call site
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _normalize(statement):
+    shape = _LITERALS.sub("?", statement)
+    shape = _LISTS.sub("(?+)", shape)
+    shape = _CASES.sub("WHEN ? THEN ? ... ", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+_normalize_cached = lru_cache(maxsize=4096)(_normalize)
+
+
+def normalize(statement):
+    """
+    the shape of a statement, literals and placeholders are replaced by ?, value
+    lists of any length by (?+), so the statements differing only by values share
+    one shape
+
+    Args:
+    * [statement] str or bytes
+
+    Returns:
+    * [str] normalized statement
+    """
+    if isinstance(statement, (bytes, bytearray)):
+        statement = statement.decode("utf8", "replace")
+    if len(statement) > _CACHED_LENGTH:
+        return _normalize(statement)
+    return _normalize_cached(statement)
+
+
+def call_site():
+    """
+    the innermost frame outside of matsuki.pysql
+
+    Returns:
+    * [str] file:line in function
+    """
+    for frame in reversed(traceback.extract_stack()):
+        if not os.path.abspath(frame.filename).startswith(_PACKAGE_DIR):
+            return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class _ShapeStats(object):
+    """
+    aggregates of one statement shape
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+
+class PySQLProfiler(object):
+
+    def __init__(self, params: dict = None):
+        """
+        per statement timing of PySQLConnection, the timings are aggregated by the
+        shape of statements, and the statements slower than slow_threshold are
+        written to a slow query log with their call site. the log is rate limited
+        by a token bucket, the entries dropped are counted in the next entry.
+
+        Usage:
+        profiler = PySQLProfiler({'slow_threshold': 0.5})
+        profiler.install()
+
+        Args:
+        * [params] bstd, blog, dir, fname,
+            slow_threshold (seconds a statement takes to be logged as slow, default is 1),
+            slow_log_rate (slow entries logged per second, default is 1),
+            slow_log_burst (slow entries logged at once after a quiet period, default is 10),
+            max_shapes (statement shapes aggregated, the others are counted as other, default is 1000)
+        """
+        params = params or {}
+
+        self.lock = threading.Lock()
+        self.shapes = {}  # shape -> _ShapeStats
+        self.max_shapes = int(params.get('max_shapes', 1000))
+        self.slow_threshold = float(params.get('slow_threshold', 1))
+        self.slow_log_rate = float(params.get('slow_log_rate', 1))
+        self.slow_log_burst = max(float(params.get('slow_log_burst', 10)), 1)
+        self.tokens = self.slow_log_burst
+        self.refilled_at = time.monotonic()
+        self.suppressed = 0  # slow entries dropped since the last one logged
+        self.slow_listeners = ()
+
+        # init with configure file
+        if 'bstd' in params.keys() and 'blog' in params.keys() \
+                and 'dir' in params.keys() and 'fname' in params.keys():
+            self.logger = Logger(bool(params['bstd']), bool(params['blog']), params['dir'], params['fname'])
+        else:
+            self.logger = Logger(True, False)
+
+    def install(self):
+        """
+        start timing the statements of PySQLConnection
+        """
+        PySQLConnection.add_listener(self.record)
+
+    def uninstall(self):
+        """
+        stop timing the statements
+        """
+        PySQLConnection.remove_listener(self.record)
+
+    def add_slow_listener(self, listener):
+        """
+        call listener(connection, statement, args, seconds, shape) for every slow statement,
+        rate limited or not, on the thread of the statement
+        """
+        self.slow_listeners = self.slow_listeners + (listener,)
+
+    def _take_token(self, now):
+        """
+        token bucket of the slow log, called with the lock held
+        """
+        self.tokens = min(self.slow_log_burst, self.tokens + (now - self.refilled_at) * self.slow_log_rate)
+        self.refilled_at = now
+        if self.tokens < 1:
+            self.suppressed += 1
+            return None
+
+        self.tokens -= 1
+        suppressed, self.suppressed = self.suppressed, 0
+        return suppressed
+
+    def record(self, connection, statement, args, seconds, error=None):
+        """
+        listener of PySQLConnection, aggregates a statement and logs it if slow
+        """
+        shape = normalize(statement)
+        slow = seconds >= self.slow_threshold
+        suppressed = None
+
+        with self.lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    shape = "other"
+                stats = self.shapes.setdefault(shape, _ShapeStats())
+
+            stats.count += 1
+            stats.total += seconds
+            stats.latency.observe(seconds)
+            if seconds > stats.max:
+                stats.max = seconds
+            if error is not None:
+                stats.errors += 1
+            if slow:
+                stats.slow += 1
+                suppressed = self._take_token(time.monotonic())
+
+        if not slow:
+            return
+
+        if suppressed is not None:
+            msg = f"slow query {seconds * 1000:.1f}ms at {call_site()}: {shape}"
+            if suppressed > 0:
+                msg += f" ({suppressed} slow queries not logged)"
+            self.logger.message(Priority.INFO, msg=msg)
+
+        for listener in self.slow_listeners:
+            listener(connection, statement, args, seconds, shape)
+
+    def stats(self, top: int = None):
+        """
+        aggregates of the statement shapes, the most time consuming first
+
+        Args:
+        * [top] int, the number of shapes returned, default is all of them
+
+        Returns:
+        * [list] dicts with shape, count, errors, slow, total, mean, max and latency histogram
+        """
+        with self.lock:
+            results = [{
+                "shape": shape,
+                "count": stats.count,
+                "errors": stats.errors,
+                "slow": stats.slow,
+                "total": stats.total,
+                "mean": stats.total / stats.count if stats.count else 0.0,
+                "max": stats.max,
+                "latency": stats.latency.snapshot(),
+            } for shape, stats in self.shapes.items()]
+
+        results.sort(key=lambda item: item["total"], reverse=True)
+        return results[:top] if top is not None else results
+
+    def reset(self):
+        """
+        clear the aggregates
+        """
+        with self.lock:
+            self.shapes.clear()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import argparse
+import json
+import queue
+import threading
+import time
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PySQLCapture import MAGIC
+from matsuki.pysql.PySQLCapture import decode_value
+from matsuki.pysql.PySQLPool import PySQLPool
+from siki.basics import Exceptions
+
+# statements replayed with query, the others with execute
+_READS = ("SELECT", "SHOW", "EXPLAIN", "DESCRIBE", "DESC", "WITH")
+
+
+def is_read(statement):
+    """
+    the statement does not write, by its first word
+    """
+    words = statement.split(None, 1)
+    return len(words) > 0 and words[0].upper() in _READS
+
+
+def read_capture(path):
+    """
+    statements of a capture file of PySQLCapture, in the order they were started.
+    lines are written as statements finish, so the statements of a capture are sorted
+    by their start. several captures appended to one file follow one another, and
+    a line cut by a crash is skipped.
+
+    Args:
+    * [path] capture file
+
+    Returns:
+    * [generator] (seconds since start, statement, args)
+    """
+    statements = {}
+    records = []  # statements of the current capture
+    base = 0.0  # where the current capture starts
+
+    with open(path, encoding="utf8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+
+            if record[0] == MAGIC:  # a new capture, numbers start again
+                records.sort(key=lambda item: item[0])
+                yield from records
+                if records:
+                    base = max(base, records[-1][0])
+                statements, records = {}, []
+                continue
+
+            if record[0] == "S":
+                statements[record[1]] = record[2]
+                continue
+
+            started, number, args = record[0], record[1], record[2]
+            statement = statements.get(number) if isinstance(number, int) else number
+            if statement is None:
+                continue
+
+            if isinstance(args, list):
+                args = tuple([decode_value(value) for value in args])
+            elif isinstance(args, dict):
+                args = {key: decode_value(value) for key, value in args.items()}
+
+            records.append((base + started, statement, args))
+
+    records.sort(key=lambda item: item[0])
+    yield from records
+
+
+def percentile(values, ratio):
+    """
+    nearest rank percentile of sorted values
+
+    Args:
+    * [values] sorted list
+    * [ratio] float, 0.99 for p99
+
+    Returns:
+    * [float] 0 if values is empty
+    """
+    if not values:
+        return 0.0
+    index = min(max(int(ratio * len(values) + 0.5) - 1, 0), len(values) - 1)
+    return values[index]
+
+
+def replay(pool: PySQLPool, path: str, speed: float = 1.0, threads: int = 8, writes: bool = False):
+    """
+    send the statements of a capture file through a pool, each statement checks out
+    a connection of its own, as a request does
+
+    Args:
+    * [pool] PySQLPool
+    * [path] capture file of PySQLCapture
+    * [speed] float, 1 replays at the captured pace, 10 ten times faster, 0 as fast as possible
+    * [threads] int, the number of threads sending statements, default is 8
+    * [writes] replay the statements that write as well, default is False, only the reads
+
+    Returns:
+    * [dict] statements, errors, skipped, seconds, throughput (statements per second),
+        latency (seconds of p50, p90, p95, p99, max and mean, with the checkout wait),
+        max_lag (seconds the replay fell behind the capture) and pool (stats of pool)
+    """
+    if not isinstance(pool, PySQLPool):
+        raise Exceptions.InvalidParamException("pool must be a PySQLPool")
+
+    threads = max(int(threads), 1)
+    work = queue.Queue(maxsize=threads * 16)
+    latencies = [[] for _ in range(threads)]  # a list per thread, merged at the end
+    errors = [0] * threads
+
+    def send(index):
+        while True:
+            item = work.get()
+            if item is None:
+                break
+
+            statement, args = item
+            started = time.perf_counter()
+            try:
+                conn = pool.get_connection(raise_error=True)
+                try:
+                    if is_read(statement):
+                        PySQLConnection.query(conn, statement, args)
+                    else:
+                        PySQLConnection.execute(conn, statement, args)
+                finally:
+                    pool.put_connection(conn)
+            except Exception:
+                errors[index] += 1
+            latencies[index].append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=send, args=(i,), name=f"PySQLReplay-{i}", daemon=True)
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    skipped = 0
+    max_lag = 0.0
+    start = time.perf_counter()
+    for at, statement, args in read_capture(path):
+        if not writes and not is_read(statement):
+            skipped += 1
+            continue
+
+        if speed > 0:
+            delay = start + at / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif -delay > max_lag:
+                max_lag = -delay
+
+        work.put((statement, args))
+
+    for _ in workers:
+        work.put(None)
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+
+    values = sorted([value for items in latencies for value in items])
+    return {
+        "statements": len(values),
+        "errors": sum(errors),
+        "skipped": skipped,
+        "seconds": seconds,
+        "throughput": len(values) / seconds if seconds > 0 else 0.0,
+        "latency": {
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1] if values else 0.0,
+            "mean": sum(values) / len(values) if values else 0.0,
+        },
+        "max_lag": max_lag,
+        "pool": pool.stats(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="replay a capture file of PySQLCapture")
+    parser.add_argument("path", help="capture file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--threads", type=int, default=8, help="threads sending statements, default is 8")
+    parser.add_argument("--pool-size", type=int, default=None, help="size of pool, default is threads")
+    parser.add_argument("--speed", default="1", help="1 for the captured pace, 10 for ten times faster, or max")
+    parser.add_argument("--writes", action="store_true", help="replay the statements that write as well")
+    options = parser.parse_args()
+
+    sql_pool = PySQLPool(options.pool_size or options.threads, {
+        "host": options.host,
+        "port": options.port,
+        "user": options.user,
+        "password": options.password,
+    })
+
+    try:
+        report = replay(sql_pool, options.path, 0 if options.speed == "max" else float(options.speed),
+                        options.threads, options.writes)
+    finally:
+        sql_pool.close()
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+from bisect import bisect_left
+
+
+# seconds, from 100us to 10s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# seconds, from 1ms to 10 minutes
+HOLD_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0)
+
+# ratio of connections in use to the maximum size of pool
+UTILIZATION_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+class Histogram(object):
+    """
+    Histogram with fixed buckets, the bucket list is allocated once so that an
+    observation only bumps a counter. It is not thread safe, the owner serializes
+    the calls with its own lock.
+    """
+
+    def __init__(self, bounds: tuple):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        record a value
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def reset(self):
+        """
+        clear all observations
+        """
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.sum = 0.0
+        self.count = 0
+
+    def snapshot(self):
+        """
+        copy of the histogram
+
+        Returns:
+        * [dict] {'buckets': [(upper bound, cumulative count), ...], 'sum': float, 'count': int}
+        """
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class PoolStats(object):
+    """
+    Counters and histograms of a connection pool, updated by the pool under its lock
+    """
+
+    COUNTERS = ("checkouts", "timeouts", "rejected", "connects", "connect_failures", "reconnects", "failed_pings",
+                "leaks", "reclaimed", "expired", "evicted")
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.reconnects = 0
+        self.failed_pings = 0
+        self.leaks = 0
+        self.reclaimed = 0
+        self.expired = 0
+        self.evicted = 0
+
+        self.checkout_wait = Histogram(LATENCY_BUCKETS)
+        self.connect_time = Histogram(LATENCY_BUCKETS)
+        self.hold_time = Histogram(HOLD_BUCKETS)
+        self.utilization = Histogram(UTILIZATION_BUCKETS)
+
+    def snapshot(self):
+        """
+        copy of the counters and histograms
+
+        Returns:
+        * [dict]
+        """
+        stats = {}
+        for name in self.COUNTERS:
+            stats[name] = getattr(self, name)
+
+        stats["checkout_wait"] = self.checkout_wait.snapshot()
+        stats["connect_time"] = self.connect_time.snapshot()
+        stats["hold_time"] = self.hold_time.snapshot()
+        stats["utilization"] = self.utilization.snapshot()
+        return stats
+
+
+def _format_labels(labels: dict, extra: str = None):
+    items = ['{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels.items()]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+def _format_bound(bound: float):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def to_prometheus(stats: dict, prefix: str = "matsuki_sqlpool", labels: dict = None):
+    """
+    Export a stats snapshot in the prometheus text format, numbers become gauges
+    and histogram snapshots become histograms
+
+    @Args:
+    * [stats] dict, the snapshot returned by PySQLPool.stats
+    * [prefix] str, prefix of the metric names
+    * [labels] dict, labels attached to every sample, such as {'pool': 'primary'}
+
+    @Returns:
+    * [str] prometheus text
+    """
+    labels = labels or {}
+    lines = []
+
+    for name, value in stats.items():
+        metric = "{}_{}".format(prefix, name)
+
+        if isinstance(value, dict) and "buckets" in value:
+            lines.append("# TYPE {} histogram".format(metric))
+            for bound, count in value["buckets"]:
+                le = 'le="{}"'.format(_format_bound(bound))
+                lines.append("{}_bucket{} {}".format(metric, _format_labels(labels, le), count))
+            lines.append("{}_sum{} {}".format(metric, _format_labels(labels), value["sum"]))
+            lines.append("{}_count{} {}".format(metric, _format_labels(labels), value["count"]))
+
+        elif isinstance(value, bool):
+            lines.append("# TYPE {} gauge".format(metric))
+            lines.append("{}{} {}".format(metric, _format_labels(labels), int(value)))
+
+        elif isinstance(value, (int, float)):
+            kind = "counter" if name in PoolStats.COUNTERS else "gauge"
+            lines.append("# TYPE {} {}".format(metric, kind))
+            lines.append("{}{} {}".format(metric, _format_labels(labels), value))
+
+    return "\n".join(lines) + "\n"
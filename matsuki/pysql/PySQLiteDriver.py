@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import atexit
+import datetime
+import decimal
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import lru_cache
+
+import pymysql
+
+# `db`.`table`, every db is an attached sqlite database
+_DATABASE_REFS = re.compile(r"`(\w+)`\s*\.\s*`")
+
+_SHOW_TABLES = re.compile(r"^\s*SHOW\s+TABLES\s+(?:IN|FROM)\s+`?(\w+)`?\s*;?\s*$", re.IGNORECASE)
+_SHOW_COLUMNS = re.compile(r"^\s*SHOW\s+(?:FULL\s+)?COLUMNS\s+(?:IN|FROM)\s+`?(\w+)`?\s*\.\s*`?(\w+)`?\s*;?\s*$",
+                           re.IGNORECASE)
+_SCHEMA_COLUMNS = re.compile(r"`?information_schema`?\s*\.\s*`?COLUMNS`?", re.IGNORECASE)
+_CREATE_DATABASE = re.compile(r"^\s*CREATE\s+(?:DATABASE|SCHEMA)\s+(?:IF\s+NOT\s+EXISTS\s+)?`?(\w+)`?",
+                              re.IGNORECASE)
+_DROP_DATABASE = re.compile(r"^\s*DROP\s+(?:DATABASE|SCHEMA)\s+(?:IF\s+EXISTS\s+)?`?(\w+)`?", re.IGNORECASE)
+
+# %s and %(name)s placeholders, outside of string literals
+_PLACEHOLDERS = re.compile(r"'(?:[^']|'')*'|%s|%\((\w+)\)s|%%")
+
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_OF = re.compile(r"\bVALUES\s*\(\s*(`?\w+`?)\s*\)", re.IGNORECASE)
+# an integer column with its attributes, in any order
+_INTEGER_COLUMN = re.compile(r"(`?\w+`?)\s+\w*INT(?:\s*\(\s*\d+\s*\))?((?:\s+(?:UNSIGNED|SIGNED|ZEROFILL|NOT\s+NULL"
+                            r"|NULL|AUTO_INCREMENT|PRIMARY\s+KEY|KEY|COMMENT\s+'(?:[^']|'')*'))+)", re.IGNORECASE)
+_TABLE_OPTIONS = re.compile(r"\)\s*(?:ENGINE|(?:DEFAULT\s+)?(?:CHARSET|CHARACTER\s+SET)|COLLATE|AUTO_INCREMENT)\b[^)]*$",
+                            re.IGNORECASE)
+
+# the largest statement bulk inserts build, sqlite itself takes up to 1GB
+MAX_ALLOWED_PACKET = 16 * 1024 * 1024
+
+# seconds a statement waits while a database is locked by the transaction of another connection
+_LOCK_TIMEOUT = 5
+
+# namespace -> temporary directory of its :memory: databases, removed at exit
+_scratch_dirs = {}
+_scratch_lock = threading.Lock()
+
+
+def _scratch(namespace):
+    with _scratch_lock:
+        path = _scratch_dirs.get(namespace)
+        if path is None:
+            path = _scratch_dirs[namespace] = tempfile.mkdtemp(prefix=f"matsuki-{namespace}-")
+        return path
+
+
+@atexit.register
+def _remove_scratch():
+    for path in _scratch_dirs.values():
+        shutil.rmtree(path, ignore_errors=True)
+
+
+@lru_cache(maxsize=1024)
+def _translate(statement, with_args):
+    """
+    mysql statement of the safe builders to sqlite, the result only depends on the
+    statement, so it is cached
+    """
+    statement = statement.replace("@@max_allowed_packet", str(MAX_ALLOWED_PACKET))
+
+    if _ON_DUPLICATE.search(statement):  # INSERT ... ON DUPLICATE KEY UPDATE, needs sqlite 3.35
+        statement = _ON_DUPLICATE.sub("ON CONFLICT DO UPDATE SET", statement)
+        head, sep, tail = statement.partition("ON CONFLICT DO UPDATE SET")
+        statement = head + sep + _VALUES_OF.sub(r"excluded.\1", tail)
+
+    if re.match(r"^\s*CREATE\s+TABLE", statement, re.IGNORECASE):
+        statement = _auto_increment(statement)
+        statement = _TABLE_OPTIONS.sub(")", statement)
+
+    if with_args:  # pymysql formats the statement only if there are args
+        def replace(matched):
+            text = matched.group(0)
+            if text == "%s":
+                return "?"
+            if text == "%%":
+                return "%"
+            if matched.group(1) is not None:
+                return ":" + matched.group(1)
+            return text.replace("%%", "%")  # a string literal, formatted by pymysql as well
+
+        statement = _PLACEHOLDERS.sub(replace, statement)
+
+    return statement
+
+
+def _auto_increment(statement):
+    """
+    an AUTO_INCREMENT column becomes INTEGER PRIMARY KEY, the rowid of sqlite, whether
+    it is declared primary key before or after AUTO_INCREMENT or by the table
+    """
+    keys = []
+
+    def replace(matched):
+        attributes = matched.group(2).upper()
+        if "AUTO_INCREMENT" not in attributes:
+            return matched.group(0)
+        keys.append(matched.group(1).strip("`"))
+        return matched.group(1) + " INTEGER PRIMARY KEY" + (" NOT NULL" if "NOT NULL" in attributes else "")
+
+    statement = _INTEGER_COLUMN.sub(replace, statement)
+    for key in keys:  # PRIMARY KEY (`id`) of the table, declared on the column now
+        statement = re.sub(r",\s*PRIMARY\s+KEY\s*\(\s*`?" + re.escape(key) + r"`?\s*\)", "", statement,
+                           flags=re.IGNORECASE)
+    return statement
+
+
+@lru_cache(maxsize=1024)
+def _databases(statement):
+    return tuple(set(_DATABASE_REFS.findall(statement)))
+
+
+def _adapt(value):
+    """
+    bound value of a type sqlite3 takes
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat(" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, bytearray):
+        return bytes(value)
+    return value
+
+
+def _literal(value):
+    """
+    sql literal of a value, as pymysql mogrify renders it
+    """
+    value = _adapt(value)
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return "X'" + value.hex() + "'"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return "(" + ",".join([_literal(item) for item in value]) + ")"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class SQLiteCursor(object):
+    """
+    cursor with the pymysql interface used by PySQLConnection, over a sqlite3 cursor
+    """
+
+    def __init__(self, connection, as_dict, unbuffered):
+        self.connection = connection
+        self.as_dict = as_dict
+        self.unbuffered = unbuffered
+        self.cursor = None
+        self.description = None
+        self.rowcount = -1
+        self.rows = None  # rows of a buffered result
+        self.columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+        self.rows = None
+
+    def mogrify(self, query, args=None):
+        """
+        statement with the args rendered as literals
+        """
+        if args is None:
+            return query
+        if isinstance(args, dict):
+            return query % {key: _literal(value) for key, value in args.items()}
+        return query % tuple([_literal(value) for value in args])
+
+    def _result(self, columns, rows):
+        """
+        a result made here instead of by sqlite
+        """
+        self.columns = tuple(columns)
+        self.description = tuple([(name, None, None, None, None, None, None) for name in columns])
+        self.rows = [self._row(row) for row in rows]
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def _row(self, row):
+        return dict(zip(self.columns, row)) if self.as_dict else tuple(row)
+
+    def _columns_of(self, db, table):
+        info = self.connection.raw_execute(f'PRAGMA "{db}".table_info("{table}")').fetchall()
+        return [(name, (col_type or "").lower(), "NO" if notnull or pk else "YES", "PRI" if pk else "", default, "")
+                for _, name, col_type, notnull, default, pk in info]
+
+    def _tables_of(self, db):
+        rows = self.connection.raw_execute(
+            f'SELECT name FROM "{db}".sqlite_master WHERE type=\'table\' AND name NOT LIKE \'sqlite_%\' '
+            f'ORDER BY name').fetchall()
+        return [row[0] for row in rows]
+
+    def _special(self, statement, args):
+        """
+        mysql statements sqlite has no form of, None if statement is not one of them
+        """
+        matched = _SHOW_TABLES.match(statement)
+        if matched:
+            db = matched.group(1)
+            self.connection.attach(db)
+            return self._result((f"Tables_in_{db}",), [(name,) for name in self._tables_of(db)])
+
+        matched = _SHOW_COLUMNS.match(statement)
+        if matched:
+            db, table = matched.group(1), matched.group(2)
+            self.connection.attach(db)
+            return self._result(("Field", "Type", "Null", "Key", "Default", "Extra"), self._columns_of(db, table))
+
+        if _SCHEMA_COLUMNS.search(statement):  # the query of PySchemaCache
+            db = (args[0] if isinstance(args, (list, tuple)) else list(args.values())[0]) if args else None
+            self.connection.attach(db)
+            rows = [(table,) + column for table in self._tables_of(db)
+                    for column in self._columns_of(db, table)]
+            return self._result(("TABLE_NAME", "COLUMN_NAME", "COLUMN_TYPE", "IS_NULLABLE", "COLUMN_KEY",
+                                 "COLUMN_DEFAULT", "EXTRA"), rows)
+
+        matched = _CREATE_DATABASE.match(statement)
+        if matched:
+            self.connection.attach(matched.group(1))
+            return self._result((), [])
+
+        matched = _DROP_DATABASE.match(statement)
+        if matched:
+            db = matched.group(1)
+            self.connection.attach(db)
+            for table in self._tables_of(db):
+                self.connection.raw_execute(f'DROP TABLE "{db}"."{table}"')
+            return self._result((), [])
+
+        return None
+
+    def execute(self, query, args=None):
+        """
+        Returns:
+        * [int] affected rows, or the number of rows of a buffered result
+        """
+        self.close()
+        if isinstance(query, (bytes, bytearray)):
+            query = query.decode("utf8")
+
+        rows = self._special(query, args)
+        if rows is not None:
+            return rows
+
+        for db in _databases(query):
+            self.connection.attach(db)
+
+        statement = _translate(query, args is not None)
+        if args is None:
+            params = ()
+        elif isinstance(args, dict):
+            params = {key: _adapt(value) for key, value in args.items()}
+        else:
+            params = tuple([_adapt(value) for value in args])
+
+        self.cursor = self.connection.raw_execute(statement, params)
+        self.description = self.cursor.description
+
+        if self.description is None:  # no result set
+            self.rowcount = max(self.cursor.rowcount, 0)
+            return self.rowcount
+
+        self.columns = tuple([d[0] for d in self.description])
+        if self.unbuffered:
+            self.rowcount = -1
+            return 0
+
+        self.rows = [self._row(row) for row in self.cursor.fetchall()]
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def fetchone(self):
+        if self.rows is not None:
+            return self.rows.pop(0) if self.rows else None
+        row = self.cursor.fetchone() if self.cursor is not None else None
+        return self._row(row) if row is not None else None
+
+    def fetchmany(self, size=1):
+        if self.rows is not None:
+            rows, self.rows = self.rows[:size], self.rows[size:]
+            return rows
+        if self.cursor is None:
+            return []
+        return [self._row(row) for row in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        if self.rows is not None:
+            rows, self.rows = self.rows, []
+            return rows
+        if self.cursor is None:
+            return []
+        return [self._row(row) for row in self.cursor.fetchall()]
+
+
+class SQLiteConnection(object):
+    """
+    sqlite3 connection with the pymysql interface used by PySQLConnection and PySQLPool.
+    the databases of `db`.`table` are attached on first use, every database is a file
+    of its own in WAL mode, so a connection reads the last committed rows and never the
+    uncommitted writes of another one, as with innodb. the :memory: databases are files
+    of a temporary directory shared by the connections of the process with the same
+    namespace, as connections to one mysql server are, and removed at exit.
+    """
+
+    def __init__(self, database=":memory:", namespace="matsuki", autocommit=True):
+        self.database = database
+        self.namespace = namespace
+        self.autocommit = autocommit
+        self.encoding = "utf8"
+        self.conn = None
+        self.attached = set()
+
+        # nothing to keep of a scratch database, it is not synced to disk
+        self.scratch = database == ":memory:"
+        self.directory = _scratch(namespace) if self.scratch else database
+        self.connect()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.sqlite3")
+
+    def _configure(self, name):
+        self.conn.execute(f'PRAGMA "{name}".journal_mode = WAL')
+        self.conn.execute(f'PRAGMA "{name}".synchronous = ' + ("OFF" if self.scratch else "NORMAL"))
+
+    def connect(self):
+        """
+        open the connection, again if it was closed
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.close()
+        self.conn = sqlite3.connect(self._path("__main__"), timeout=_LOCK_TIMEOUT, check_same_thread=False,
+                                    isolation_level=None if self.autocommit else "DEFERRED")
+        self._configure("main")
+        self.attached = set()
+
+    def attach(self, name):
+        """
+        attach the database name if it is not yet
+        """
+        if name is None or name in self.attached or name in ("main", "temp"):
+            return
+
+        self.conn.execute("ATTACH DATABASE ? AS " + f'"{name}"', (self._path(name),))
+        self._configure(name)
+        self.attached.add(name)
+
+    def raw_execute(self, statement, params=()):
+        """
+        execute on the sqlite3 connection, retried while a database is locked by the
+        transaction of another connection
+        """
+        deadline = time.monotonic() + _LOCK_TIMEOUT
+        while True:
+            try:
+                return self.conn.execute(statement, params)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or time.monotonic() > deadline:
+                    raise
+                time.sleep(0.001)
+
+    @property
+    def open(self):
+        return self.conn is not None
+
+    def cursor(self, cursor=None):
+        """
+        Args:
+        * [cursor] a pymysql cursor class, dict rows by default as PySQLConnection.connect
+        """
+        as_dict = cursor is None or issubclass(cursor, pymysql.cursors.DictCursorMixin)
+        unbuffered = cursor is not None and issubclass(cursor, pymysql.cursors.SSCursor)
+        return SQLiteCursor(self, as_dict, unbuffered)
+
+    def get_autocommit(self):
+        return self.autocommit
+
+    def begin(self):
+        self.raw_execute("BEGIN")
+
+    def commit(self):
+        if self.conn.in_transaction:
+            self.raw_execute("COMMIT")
+
+    def rollback(self):
+        if self.conn.in_transaction:
+            self.conn.rollback()
+
+    def ping(self, reconnect=True):
+        if self.conn is None:
+            if not reconnect:
+                raise pymysql.err.InterfaceError("connection is closed")
+            self.connect()
+        self.conn.execute("SELECT 1")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def connect(database=":memory:", namespace="matsuki", autocommit=True, **kwargs):
+    """
+    Create a sqlite connection with the interface of a pymysql connection
+
+    @Args:
+    * [database] :memory: for scratch databases shared by the connections of the process and
+        removed at exit, or a directory where every database is a file, default is :memory:
+    * [namespace] str, connections of different namespaces see different scratch databases
+    * [autocommit] default is True, as PySQLConnection.connect
+    * [kwargs] the mysql arguments, such as user and password, are ignored
+
+    @Returns:
+    * [connection] SQLiteConnection
+    """
+    return SQLiteConnection(database, namespace, autocommit)
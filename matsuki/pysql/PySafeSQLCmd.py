@@ -1,65 +1,370 @@
 # -*- coding: utf-8 -*-
 # Author: Orlando Chen
 # Created: May 08, 2018
-# Modified: May 19, 2020
+# Modified: Oct 18, 2026
 
+import base64
+import json
 import re
+from functools import lru_cache
+from functools import partial
 
 from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PyRoutingPool import RoutingSession
 from siki.basics import Exceptions
 
+_KEYWORDS = re.compile(r"(ALTER|CREATE|DELETE|DROP|EXEC(UTE){0,1}|INSERT( +INTO){0,1}|MERGE|SELECT|UPDATE|UNION( +ALL){0,1})")
+
+# identifiers are always quoted with backticks, only a backtick or NUL can break out of the quoting
+_IDENTIFIER = re.compile(r"^[^`\x00]+$")
+
+# PySchemaCache used to validate tables and columns, None means identifiers are only checked by pattern
+_schema_cache = None
+
+
+def use_schema_cache(cache):
+    """
+    validate table and column names against a schema cache, and answer
+    safe_query_tables and safe_query_columns from it
+
+    Args:
+    * [cache] PySchemaCache, None to stop using it
+    """
+    global _schema_cache
+    _schema_cache = cache
+
+
+# PyQueryCache of safe_query_id and safe_simple_query, None means reads always go to the database
+_query_cache = None
+
+
+def use_query_cache(cache):
+    """
+    serve safe_query_id and safe_simple_query from a read-through cache, the
+    writes of safe_insert, safe_bulk_insert, safe_update, safe_delete,
+    safe_update_many, safe_delete_many and safe_upsert invalidate the cached
+    reads of their table once committed
+
+    Args:
+    * [cache] PyQueryCache, None to stop using it
+    """
+    global _query_cache
+    _query_cache = cache
+
+
+def _cached_query(conn, db, table, str_sql, args, result=PySQLConnection.DICT):
+    """
+    query through the query cache if it is used, reads in a transaction
+    scope must see its own writes and skip the cache, only dict rows are cached
+    """
+    if _query_cache is None or result != PySQLConnection.DICT or PySQLConnection.in_transaction(conn):
+        return PySQLConnection.query(conn, str_sql, args, result)
+    return _query_cache.fetch(db, table, str_sql, args, partial(PySQLConnection.query, conn, str_sql, args))
+
+
+def _invalidate(conn, db, table):
+    """
+    the cached reads of table are invalid once the write on conn is committed
+    """
+    if _query_cache is not None:
+        PySQLConnection.on_commit(conn, partial(_query_cache.invalidate, db, table))
+
+
+def _as_list(rows):
+    """
+    rows of PySQLConnection.query as a list, whatever how many they are
+    """
+    if rows is None:
+        return []
+    if isinstance(rows, dict):  # only one row returned
+        return [rows]
+    return list(rows)
+
 
 def _has_keywords(arg):
-    pattern = r"(ALTER|CREATE|DELETE|DROP|EXEC(UTE){0,1}|INSERT( +INTO){0,1}|MERGE|SELECT|UPDATE|UNION( +ALL){0,1})"
-    return re.search(pattern, arg) is not None
+    return _KEYWORDS.search(arg) is not None
+
+
+def _route(conn, write):
+    """
+    a routing session gives the primary connection for writes and a replica
+    connection for reads, a plain connection is used as it is
+    """
+    if isinstance(conn, RoutingSession):
+        return conn.writer() if write else conn.reader()
+    return conn
+
+
+def transaction(conn):
+    """
+    transaction scope of the safe_* calls on conn, the writes are committed once
+    at the end, or rolled back if an exception is raised. on a routing session
+    the scope runs on the primary, and reads in it are served by the primary too
+
+    Usage:
+    with PySafeSQLCmd.transaction(conn):
+        safe_update(conn, db, table, item_id, args)
+        safe_insert(conn, db, table, args)
+
+    Args:
+    * [conn] connection of sql, or routing session
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("conn cannot be null")
+
+    return PySQLConnection.transaction(_route(conn, write=True))
+
+
+def _nullable(value):
+    """
+    the value to bind for an update, None and empty strings are stored as NULL, 0 and False are kept
+    """
+    return None if value is None or value == "" else value
+
+
+@lru_cache(maxsize=4096)
+def _valid_identifier(name):
+    return isinstance(name, str) and _IDENTIFIER.match(name) is not None
+
+
+@lru_cache(maxsize=4096)
+def _valid_fragment(fragment):
+    return fragment is None or not _has_keywords(str(fragment).upper())
+
+
+def _check_identifiers(*names):
+    """
+    database, table and column names cannot be bound as parameters, they are quoted with
+    backticks, so any name is accepted but an empty one or one with a backtick or NUL
+    """
+    for name in names:
+        if not _valid_identifier(name):
+            raise Exceptions.SQLInjectionException(f"SQL injection detected, invalid identifier[{name}]")
+
+
+def _check_schema(conn, db, tables, columns=()):
+    """
+    tables and columns must exist when a schema cache is used
+    """
+    if _schema_cache is not None:
+        for table in tables:
+            _schema_cache.validate(conn, db, table, columns)
+
+
+def _check_fragments(*fragments):
+    """
+    select, where and order by clauses are sql text given by the caller, values should be
+    bound with %s placeholders, so the clauses of a call site hardly change and the check
+    result is cached
+    """
+    for fragment in fragments:
+        if not _valid_fragment(fragment):
+            raise Exceptions.SQLInjectionException(f"SQL injection detected, params: [{fragment}]")
+
+
+@lru_cache(maxsize=1024)
+def _insert_statement(db, table, keys):
+    _check_identifiers(db, table, *keys)
+    columns = "`" + "`, `".join(keys) + "`"
+    values = ", ".join(["%s"] * len(keys))
+    return f"INSERT INTO `{db}`.`{table}` ({columns}) VALUES ({values})"
+
+
+@lru_cache(maxsize=1024)
+def _query_id_statement(db, table):
+    _check_identifiers(db, table)
+    return f"SELECT * FROM `{db}`.`{table}` WHERE `id`=%s"
+
+
+@lru_cache(maxsize=1024)
+def _query_ids_statement(db, table, size):
+    _check_identifiers(db, table)
+    return f"SELECT * FROM `{db}`.`{table}` WHERE `id` IN ({', '.join(['%s'] * size)})"
+
+
+@lru_cache(maxsize=1024)
+def _select_statement(db, tables, select_con, where_con, order_by):
+    _check_identifiers(db, *tables)
+    _check_fragments(select_con, where_con, order_by)
+
+    str_tables = ", ".join([f"`{db}`.`{t}`" for t in tables])
+    str_sql = f"SELECT {select_con} FROM {str_tables}"
+    if where_con is not None:
+        str_sql += f' WHERE {where_con}'
+    if order_by is not None:
+        str_sql += f' ORDER BY {order_by}'
+    return str_sql
 
 
-def _sql_args_check(*args):
-    for arg in args:
-        if _has_keywords(str(arg).upper()):
-            return False
-    return True
+@lru_cache(maxsize=1024)
+def _paged_statement(db, table, select_con, where_con, keys, descending, after):
+    _check_identifiers(db, table, *keys)
+    _check_fragments(select_con, where_con)
+
+    op = "<" if descending else ">"
+    conditions = []
+    if where_con is not None:
+        conditions.append(f"({where_con})")
+    if after:  # rows after the last one of previous page
+        if len(keys) == 1:
+            conditions.append(f"`{keys[0]}`{op}%s")
+        else:
+            conditions.append(f"(`{keys[0]}`{op}%s OR (`{keys[0]}`=%s AND `{keys[1]}`{op}%s))")
+
+    str_sql = f"SELECT {select_con} FROM `{db}`.`{table}`"
+    if conditions:
+        str_sql += " WHERE " + " AND ".join(conditions)
+    order = " DESC" if descending else ""
+    str_sql += " ORDER BY " + ", ".join([f"`{key}`{order}" for key in keys]) + " LIMIT %s"
+    return str_sql
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode("utf8")).decode("ascii")
+
+
+def _decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise Exceptions.InvalidParamException(f"invalid page cursor[{cursor}]")
+    return values
+
+
+@lru_cache(maxsize=1024)
+def _update_statement(db, table, keys):
+    _check_identifiers(db, table, *keys)
+    p_vals = ", ".join([f"`{key}`=%s" for key in keys])
+    return f"UPDATE `{db}`.`{table}` SET {p_vals} WHERE `id`=%s"
+
+
+@lru_cache(maxsize=1024)
+def _delete_statement(db, table):
+    _check_identifiers(db, table)
+    return f"DELETE FROM `{db}`.`{table}` WHERE `id`=%s"
+
+
+@lru_cache(maxsize=1024)
+def _update_many_statement(db, table, keys, size):
+    _check_identifiers(db, table, *keys)
+    cases = " ".join(["WHEN %s THEN %s"] * size)
+    p_vals = ", ".join([f"`{key}`=CASE `id` {cases} ELSE `{key}` END" for key in keys])
+    return f"UPDATE `{db}`.`{table}` SET {p_vals} WHERE `id` IN ({', '.join(['%s'] * size)})"
+
+
+@lru_cache(maxsize=1024)
+def _delete_many_statement(db, table, size):
+    _check_identifiers(db, table)
+    return f"DELETE FROM `{db}`.`{table}` WHERE `id` IN ({', '.join(['%s'] * size)})"
+
+
+@lru_cache(maxsize=1024)
+def _upsert_statement(db, table, keys, update_keys, size):
+    _check_identifiers(db, table, *keys, *update_keys)
+    columns = "`" + "`, `".join(keys) + "`"
+    values = ", ".join(["(" + ", ".join(["%s"] * len(keys)) + ")"] * size)
+    updates = ", ".join([f"`{key}`=VALUES(`{key}`)" for key in update_keys])
+    return f"INSERT INTO `{db}`.`{table}` ({columns}) VALUES {values} ON DUPLICATE KEY UPDATE {updates}"
+
+
+def _chunks(items, chunk_size):
+    if int(chunk_size) <= 0:
+        raise Exceptions.InvalidParamException("chunk_size must be positive")
+    for start in range(0, len(items), int(chunk_size)):
+        yield items[start:start + int(chunk_size)]
+
+
+def _same_keys(rows, name):
+    """
+    keys of the first dict, all the dicts must have the same keys
+    """
+    if not isinstance(rows, list) or len(rows) == 0 or type(rows[0]) is not dict:
+        raise Exceptions.InvalidParamException(f"{name} must be a non-empty list of dict")
+
+    keys = tuple(rows[0].keys())
+    key_set = set(keys)
+    for row in rows:
+        if type(row) is not dict or row.keys() != key_set:
+            raise Exceptions.InvalidParamException(f"{name} must have the same keys")
+    return keys
 
 
 def safe_insert(conn, db, table, args, debug=False):
     """
-    safely inserting database, and avoid sql injection attack
-    
+    safely inserting database, and avoid sql injection attack,
+    the values are sent as bound parameters
+
     Args:
     * [conn] connection of sql
     * [db] database name
     * [table] table name
     * [args(dict)] the data to insert, something like: {id:1, key1:val1, key2:val2, ...}
     * [debug] default to False, if you wannar to see the output sql statement, make it to True
-    
+
     Returns:
-    * [sql] str, command of sql
+    * [rows] int, the number of affected rows
     """
-
-    res = _sql_args_check(db, table, args.keys(), args.values())
-
-    if res is False:
-        raise Exceptions.SQLInjectionException(
-            f"SQL injection detected, params: table[{table}], args[{args}]")
-
     if conn is None:
         raise Exceptions.InvalidParamException("conn cannot be null")
 
     if type(args) is not dict:
         raise Exceptions.InvalidParamException("args must be dict type")
 
-    # generate a insert sql command
-    keys = "`" + "`, `".join(args.keys()) + "`"
-    values = "'" + "', '".join(args.values()) + "'"
-
     # generate insert sentence
-    str_sql = f"INSERT INTO `{db}`.`{table}` ({keys}) VALUES ({values})"
+    keys = tuple(args.keys())
+    str_sql = _insert_statement(db, table, keys)
+    values = tuple(args.values())
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,), keys)
+
+    if debug:  # for debug only
+        print(str_sql, values)
+
+    # executing sql command
+    rows = PySQLConnection.execute(conn, str_sql, values)
+    _invalidate(conn, db, table)
+    return rows
+
+
+def safe_bulk_insert(conn, db, table, rows, debug=False, max_packet=None):
+    """
+    safely inserting many rows with multi-row INSERT statements, the statements are
+    chunked under max_allowed_packet of server and each chunk is committed on its own
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [rows(list)] the data to insert, dicts with the same keys, like [{key1:val1, key2:val2}, ...]
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [max_packet] int, bytes a statement may take, default is max_allowed_packet of server, asked once per connection
+
+    Returns:
+    * [rows] int, the number of affected rows
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("conn cannot be null")
+
+    # generate insert sentence from the keys of the first row
+    keys = _same_keys(rows, "rows")
+    str_sql = _insert_statement(db, table, keys)
+    values = [tuple([row[key] for key in keys]) for row in rows]
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,), keys)
 
     if debug:  # for debug only
-        print(str_sql)
+        print(str_sql, f"{len(values)} rows")
 
     # executing sql command
-    return PySQLConnection.execute(conn, str_sql)
+    try:
+        return PySQLConnection.multi_execute(conn, str_sql, values, max_packet)
+    finally:  # the chunks before a failure are committed
+        _invalidate(conn, db, table)
 
 
 def safe_query_id(conn, db, table, item_id, debug=False):
@@ -76,27 +381,76 @@ def safe_query_id(conn, db, table, item_id, debug=False):
     Returns:
     * [rows(dict)] the execution results
     """
-    res = _sql_args_check(db, table, item_id)
-    if res is False:
-        raise Exceptions.SQLInjectionException(
-            f"SQL injection detected, params: table[{table}], id[{item_id}]")
-
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
     # generate query sentence
-    str_sql = f"SELECT * FROM `{db}`.`{table}` WHERE `id`='{item_id}'"
+    str_sql = _query_id_statement(db, table)
+
+    conn = _route(conn, write=False)
+    _check_schema(conn, db, (table,))
 
     if debug:  # for debug only
-        print(str_sql)
+        print(str_sql, item_id)
 
     # executing sql
-    return PySQLConnection.query(conn, str_sql)
+    return _cached_query(conn, db, table, str_sql, (item_id,))
+
+
+def safe_query_ids(conn, db, table, ids, debug=False, chunk_size=1000):
+    """
+    safely querying many rows by id, the ids are deduplicated and queried with
+    WHERE `id` IN (...), chunk_size ids a query
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [ids] list of the item ids want to search
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [chunk_size] int, the number of ids of a query, default is 1000
+
+    Returns:
+    * [rows(dict)] {id: row}, keyed by the ids given, so "7" of a url finds the row of id 7,
+        the ids not found are left out
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    if int(chunk_size) <= 0:
+        raise Exceptions.InvalidParamException("chunk_size must be positive")
+
+    unique = list(dict.fromkeys(ids))
+
+    conn = _route(conn, write=False)
+    _check_schema(conn, db, (table,))
+
+    results = {}
+    for start in range(0, len(unique), int(chunk_size)):
+        chunk = tuple(unique[start:start + int(chunk_size)])
+        str_sql = _query_ids_statement(db, table, len(chunk))
+
+        if debug:  # for debug only
+            print(str_sql, chunk)
+
+        # the driver returns the id column typed, rows are matched to the ids by text
+        wanted = {}
+        for item_id in chunk:
+            wanted.setdefault(str(item_id), []).append(item_id)
+
+        # executing sql
+        for row in _as_list(PySQLConnection.query(conn, str_sql, chunk)):
+            for item_id in wanted.get(str(row["id"]), [row["id"]]):
+                results[item_id] = row
+    return results
 
 
-def safe_simple_query(conn, db, table, select_con, where_con=None, order_by=None, debug=False):
+def safe_simple_query(conn, db, table, select_con, where_con=None, order_by=None, debug=False, where_args=None,
+                      result=PySQLConnection.DICT):
     """
     safely simple querying, not allow nested querying to avoid sql injection.
+    values in the where condition should be %s placeholders given by where_args,
+    such as where_con="`name`=%s AND `age`>%s", where_args=("seago", 18)
 
     Args:
     * [conn] connection of sql
@@ -106,34 +460,131 @@ def safe_simple_query(conn, db, table, select_con, where_con=None, order_by=None
     * [where_con] where condition
     * [order_by] order by command, default sequency is asc, if you want a desc results, append "DESC" to your command
     * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [where_args] tuple or list, values of the placeholders in where condition
+    * [result] format of rows, DICT, TUPLE, SLOTS or COLUMNS of PySQLConnection, default is DICT
 
     Returns:
-    * [rows(dict/list)] dict, the execution results
+    * [rows(dict/list)] dict, the execution results, see PySQLConnection.query for the other formats
     """
-    res = _sql_args_check(db, table, select_con, where_con, order_by)
-    if res is False:
-        raise Exceptions.SQLInjectionException(
-            f"SQL injection detected, params: table[{table}] select[{select_con}] where[{where_con}] order[{order_by}]"
-        )
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    # generate simple querying
+    str_sql = _select_statement(db, (table,), select_con, where_con, order_by)
+
+    conn = _route(conn, write=False)
+    _check_schema(conn, db, (table,))
+
+    if debug:  # for debug only
+        print(str_sql, where_args)
+
+    # executing sql
+    return _cached_query(conn, db, table, str_sql, where_args, result)
+
+
+def safe_simple_query_iter(conn, db, table, select_con, where_con=None, order_by=None, debug=False, where_args=None,
+                           chunk_size=1000, result=PySQLConnection.DICT):
+    """
+    same as safe_simple_query, but rows are streamed from the server in chunks with
+    a server side cursor, for exports and reports over large tables
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [select_con] selection condition
+    * [where_con] where condition
+    * [order_by] order by command, default sequency is asc, if you want a desc results, append "DESC" to your command
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [where_args] tuple or list, values of the placeholders in where condition
+    * [chunk_size] int, the number of rows fetched at a time, default is 1000
+    * [result] format of rows, DICT, TUPLE, SLOTS or COLUMNS of PySQLConnection, default is DICT
 
+    Returns:
+    * [generator] list of dict, at most chunk_size rows each, see PySQLConnection.stream_query for the other formats
+    """
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
     # generate simple querying
-    str_sql = f'SELECT {select_con} FROM `{db}`.`{table}`'
-    if where_con is not None:
-        str_sql += f' WHERE {where_con}'
-    if order_by is not None:
-        str_sql += f' ORDER BY {order_by}'
+    str_sql = _select_statement(db, (table,), select_con, where_con, order_by)
+
+    conn = _route(conn, write=False)
+    _check_schema(conn, db, (table,))
 
     if debug:  # for debug only
-        print(str_sql)
+        print(str_sql, where_args)
 
-        # executing sql
-    return PySQLConnection.query(conn, str_sql)
+    # executing sql
+    return PySQLConnection.stream_query(conn, str_sql, where_args, chunk_size, result)
+
+
+def safe_paged_query(conn, db, table, select_con, where_con=None, where_args=None, key="id", page_size=50,
+                     cursor=None, descending=False, debug=False):
+    """
+    safely querying a page of rows with keyset pagination, rows are ordered by an indexed
+    key column and a page starts after the last row of the previous one, so every page
+    costs the same however deep it is. if the key is not unique, rows of the same key are
+    ordered by id.
+
+    Usage:
+    rows, cursor = safe_paged_query(conn, db, table, "*", page_size=100)
+    while cursor is not None:
+        rows, cursor = safe_paged_query(conn, db, table, "*", page_size=100, cursor=cursor)
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [select_con] selection condition, must include the key column and id
+    * [where_con] where condition
+    * [where_args] tuple or list, values of the placeholders in where condition
+    * [key] the indexed column to page on, default is id
+    * [page_size] int, the number of rows of a page, default is 50
+    * [cursor] str, the cursor returned with the previous page, None for the first page
+    * [descending] default to False, pages go from the largest key to the smallest if True
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+
+    Returns:
+    * [rows(list), cursor(str)] the rows of page, and the cursor of the next page, None if it is the last page
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    if int(page_size) <= 0:
+        raise Exceptions.InvalidParamException("page_size must be positive")
+
+    keys = (key,) if key == "id" else (key, "id")
+
+    # generate paged querying
+    str_sql = _paged_statement(db, table, select_con, where_con, keys, bool(descending), cursor is not None)
+    args = tuple(where_args or ())
+    if cursor is not None:
+        last = _decode_cursor(cursor, len(keys))
+        args += tuple(last) if len(keys) == 1 else (last[0], last[0], last[1])
+    args += (int(page_size) + 1,)  # one more row tells if there is a next page
+
+    conn = _route(conn, write=False)
+    _check_schema(conn, db, (table,), keys)
+
+    if debug:  # for debug only
+        print(str_sql, args)
+
+    # executing sql
+    rows = _as_list(_cached_query(conn, db, table, str_sql, args))
+
+    if len(rows) <= int(page_size):
+        return rows, None
+
+    rows = rows[:int(page_size)]
+    try:
+        return rows, _encode_cursor([rows[-1][k] for k in keys])
+    except KeyError:
+        raise Exceptions.InvalidParamException(f"select_con must include the columns {', '.join(keys)}")
 
 
-def safe_multiple_tables_query(conn, db: str, tables: list, select_con, where_con=None, order_by=None, debug=False):
+def safe_multiple_tables_query(conn, db: str, tables: list, select_con, where_con=None, order_by=None, debug=False,
+                               where_args=None, result=PySQLConnection.DICT):
     """
     safely multiple table cross querying, not allow nested querying to avoid sql injection.
 
@@ -145,43 +596,35 @@ def safe_multiple_tables_query(conn, db: str, tables: list, select_con, where_co
     * [where_con] where condition
     * [order_by] order by command, default sequency is asc, if you want a desc results, append "DESC" to your command
     * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [where_args] tuple or list, values of the placeholders in where condition
+    * [result] format of rows, DICT, TUPLE, SLOTS or COLUMNS of PySQLConnection, default is DICT
 
     Returns:
-    * [rows(dict/list)] dict, the execution results
+    * [rows(dict/list)] dict, the execution results, see PySQLConnection.query for the other formats
     """
     if not isinstance(tables, list):
         raise Exceptions.InvalidParamException("tables must be a list")
 
-    res = _sql_args_check(db, *tables, select_con, where_con, order_by)
-    if res is False:
-        raise Exceptions.SQLInjectionException(
-            f"SQL injection detected, params: table[{tables}] select[{select_con}] where[{where_con}] order[{order_by}]"
-        )
-
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
     # generate simple querying
-    str_tables = ''
-    for t in tables:
-        str_tables += f"`{db}`.`{t}`,"
+    str_sql = _select_statement(db, tuple(tables), select_con, where_con, order_by)
 
-    str_sql = f"SELECT {select_con} FROM {str_tables[:-1]}"
-    if where_con is not None:
-        str_sql += f' WHERE {where_con}'
-    if order_by is not None:
-        str_sql += f' ORDER BY {order_by}'
+    conn = _route(conn, write=False)
+    _check_schema(conn, db, tables)
 
     if debug:  # for debug only
-        print(str_sql)
+        print(str_sql, where_args)
 
     # executing sql
-    return PySQLConnection.query(conn, str_sql)
+    return PySQLConnection.query(conn, str_sql, where_args, result)
 
 
 def safe_update(conn, db, table, item_id, args, debug=False):
     """
-    safely updating database, and avoid sql injection attack
+    safely updating database, and avoid sql injection attack,
+    None and empty strings are stored as NULL, 0 and False are kept
 
     Args:
     * [conn] connection of sql
@@ -192,34 +635,26 @@ def safe_update(conn, db, table, item_id, args, debug=False):
     * [debug] default to False, if you wannar to see the output sql statement, make it to True
 
     Returns:
-    * [sql] str, the command of sql
+    * [rows] int, the number of affected rows
     """
-    res = _sql_args_check(db, table, item_id, args.keys(), args.values())
-    if res is False:
-        raise Exceptions.SQLInjectionException(
-            f"SQL injection detected, params: table[{table}] item_id[{item_id}] vals[{args}]"
-        )
-
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
-    # generate sql querying
-    setval = []
-    for key, val in args.items():
-        if val:
-            setval.append("`" + str(key) + "`='" + str(val) + "'")
-        else:
-            setval.append("`" + str(key) + "`=NULL")
-    p_vals = ", ".join(setval)
-
     # generate sql
-    str_sql = f"UPDATE `{db}`.`{table}` SET {p_vals} WHERE `id`='{item_id}'"
+    keys = tuple(args.keys())
+    str_sql = _update_statement(db, table, keys)
+    values = tuple([_nullable(val) for val in args.values()]) + (item_id,)
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,), keys)
 
     if debug:  # for debug only
-        print(str_sql)
+        print(str_sql, values)
 
-        # executing sql
-    return PySQLConnection.execute(conn, str_sql)
+    # executing sql
+    rows = PySQLConnection.execute(conn, str_sql, values)
+    _invalidate(conn, db, table)
+    return rows
 
 
 def safe_delete(conn, db, table, item_id, debug=False):
@@ -233,25 +668,166 @@ def safe_delete(conn, db, table, item_id, debug=False):
     * [item_id] the item id want to delete
 
     Returns:
-    * [sql] str, the command of sql    
+    * [rows] int, the number of affected rows
     """
-    res = _sql_args_check(table, item_id)
-    if res is False:
-        raise Exceptions.SQLInjectionException(
-            f"SQL injection detected, params: table[{table}] item_id[{item_id}]"
-        )
-
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
     # generate sql
-    str_sql = f"DELETE FROM `{db}`.`{table}` WHERE `id` = '{item_id}'"
+    str_sql = _delete_statement(db, table)
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,))
 
     if debug:  # for deubg
-        print(str_sql)
+        print(str_sql, item_id)
 
     # executing sql
-    return PySQLConnection.execute(conn, str_sql)
+    rows = PySQLConnection.execute(conn, str_sql, (item_id,))
+    _invalidate(conn, db, table)
+    return rows
+
+
+def safe_update_many(conn, db, table, items, debug=False, chunk_size=500):
+    """
+    safely updating many rows, with one UPDATE ... CASE `id` ... statement a chunk,
+    None and empty strings are stored as NULL, 0 and False are kept
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [items(dict)] {item_id: args}, the args of all items have the same keys, like {1: {key1: val1}, 2: {key1: val2}}
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [chunk_size] int, the number of rows of a statement, default is 500
+
+    Returns:
+    * [rows] int, the number of affected rows
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    if type(items) is not dict:
+        raise Exceptions.InvalidParamException("items must be dict type")
+
+    if len(items) == 0:  # nothing to update
+        return 0
+
+    keys = _same_keys(list(items.values()), "args of items")
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,), keys)
+
+    rows = 0
+    try:
+        for chunk in _chunks(list(items.items()), chunk_size):
+            str_sql = _update_many_statement(db, table, keys, len(chunk))
+            values = []
+            for key in keys:
+                for item_id, args in chunk:
+                    values += [item_id, _nullable(args[key])]
+            values += [item_id for item_id, _ in chunk]
+
+            if debug:  # for debug only
+                print(str_sql, values)
+
+            # executing sql
+            rows += PySQLConnection.execute(conn, str_sql, values)
+    finally:  # the chunks before a failure are committed
+        _invalidate(conn, db, table)
+    return rows
+
+
+def safe_delete_many(conn, db, table, ids, debug=False, chunk_size=1000):
+    """
+    safely deleting many rows, with one DELETE ... WHERE `id` IN (...) statement a chunk
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [ids] list of the item ids want to delete
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [chunk_size] int, the number of ids of a statement, default is 1000
+
+    Returns:
+    * [rows] int, the number of affected rows
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    unique = list(dict.fromkeys(ids))
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,))
+
+    rows = 0
+    try:
+        for chunk in _chunks(unique, chunk_size):
+            str_sql = _delete_many_statement(db, table, len(chunk))
+
+            if debug:  # for debug only
+                print(str_sql, chunk)
+
+            # executing sql
+            rows += PySQLConnection.execute(conn, str_sql, chunk)
+    finally:  # the chunks before a failure are committed
+        _invalidate(conn, db, table)
+    return rows
+
+
+def safe_upsert(conn, db, table, rows, update_keys=None, debug=False, chunk_size=500):
+    """
+    safely inserting rows, or updating them if the primary or an unique key exists, with
+    one multi-row INSERT ... ON DUPLICATE KEY UPDATE statement a chunk
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+    * [rows(list)] the data to upsert, dicts with the same keys, like [{id:1, key1:val1}, ...]
+    * [update_keys] list of the columns updated if the row exists, default is all the keys except id
+    * [debug] default to False, if you wannar to see the output sql statement, make it to True
+    * [chunk_size] int, the number of rows of a statement, default is 500
+
+    Returns:
+    * [rows] int, the number of affected rows, an updated row counts 2 as mysql reports
+    """
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    if type(rows) is list and len(rows) == 0:  # nothing to upsert
+        return 0
+
+    keys = _same_keys(rows, "rows")
+    if update_keys is None:
+        update_keys = [key for key in keys if key != "id"]
+    update_keys = tuple(update_keys)
+    if len(update_keys) == 0:
+        raise Exceptions.InvalidParamException("update_keys cannot be empty")
+
+    # VALUES() of a column not inserted is its default, the rows would be overwritten with it
+    missing = [key for key in update_keys if key not in keys]
+    if missing:
+        raise Exceptions.InvalidParamException(f"update_keys {missing} are not keys of rows")
+
+    conn = _route(conn, write=True)
+    _check_schema(conn, db, (table,), keys + update_keys)
+
+    affected = 0
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            str_sql = _upsert_statement(db, table, keys, update_keys, len(chunk))
+            values = [row[key] for row in chunk for key in keys]
+
+            if debug:  # for debug only
+                print(str_sql, values)
+
+            # executing sql
+            affected += PySQLConnection.execute(conn, str_sql, values)
+    finally:  # the chunks before a failure are committed
+        _invalidate(conn, db, table)
+    return affected
 
 
 def safe_query_tables(conn, db):
@@ -263,22 +839,25 @@ def safe_query_tables(conn, db):
     * [db] database name
 
     Returns:
-    * [rows] dict, the execution results
-    * [sql] str, the command of sql    
+    * [rows] list, names of the tables
     """
-    res = _sql_args_check(db)
-    if res is False:
-        raise Exceptions.SQLInjectionException(f"SQL injection detected, params: db[{db}]")
+    _check_identifiers(db)
 
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
+    conn = _route(conn, write=False)
+
+    # answered by the schema cache, without round trip
+    if _schema_cache is not None:
+        return _schema_cache.tables(conn, db)
+
     # generating sql
     str_sql = f"SHOW TABLES IN `{db}`"
 
     # executing sql
     final_results = []
-    for i in PySQLConnection.query(conn, str_sql):  # obtaining a list
+    for i in _as_list(PySQLConnection.query(conn, str_sql)):  # obtaining a list
         for k, v in i.items():
             final_results.append(v)
     return final_results
@@ -294,18 +873,51 @@ def safe_query_columns(conn, db, table):
     * [table] table name
 
     Returns:
-    * [rows] dict, the execution results
-    * [sql] str, the command of sql    
+    * [rows] list, the columns of table
     """
-    res = _sql_args_check(db, table)
-    if res is False:
-        raise Exceptions.SQLInjectionException(f"SQL injection detected, params: db[{db}] table[{table}]")
+    _check_identifiers(db, table)
 
     if conn is None:
         raise Exceptions.InvalidParamException("Conn cannot be null")
 
+    conn = _route(conn, write=False)
+
+    # answered by the schema cache, without round trip
+    if _schema_cache is not None:
+        return _schema_cache.columns(conn, db, table)
+
     # generating sql
     str_sql = f'SHOW COLUMNS IN `{db}`.`{table}`'
 
     # executing sql
     return PySQLConnection.query(conn, str_sql)  # obtaining a list
+
+
+def safe_query_column_types(conn, db, table):
+    """
+    types of the columns in table, from the schema cache if it is used
+
+    Args:
+    * [conn] connection of sql
+    * [db] database name
+    * [table] table name
+
+    Returns:
+    * [dict] {column: type}, such as {'id': 'bigint(20)', 'name': 'varchar(64)'}
+    """
+    _check_identifiers(db, table)
+
+    if conn is None:
+        raise Exceptions.InvalidParamException("Conn cannot be null")
+
+    conn = _route(conn, write=False)
+
+    if _schema_cache is not None:
+        return _schema_cache.column_types(conn, db, table)
+
+    rows = PySQLConnection.query(conn, f'SHOW COLUMNS IN `{db}`.`{table}`')
+    if rows is None:
+        return None
+    if isinstance(rows, dict):
+        rows = [rows]
+    return {row["Field"]: row["Type"] for row in rows}
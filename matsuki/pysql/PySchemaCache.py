@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import threading
+import time
+
+from matsuki.pysql import PySQLConnection
+from siki.basics import Exceptions
+
+_COLUMNS_SQL = "SELECT `TABLE_NAME`, `COLUMN_NAME`, `COLUMN_TYPE`, `IS_NULLABLE`, `COLUMN_KEY`, " \
+               "`COLUMN_DEFAULT`, `EXTRA` FROM `information_schema`.`COLUMNS` " \
+               "WHERE `TABLE_SCHEMA`=%s ORDER BY `TABLE_NAME`, `ORDINAL_POSITION`"
+
+
+class _Schema(object):
+    """
+    tables and columns of a database, replaced as a whole on reload
+    """
+
+    def __init__(self, rows):
+        self.loaded_at = time.monotonic()
+        self.columns = {}  # table -> list of rows in the form of SHOW COLUMNS
+        self.types = {}  # table -> {column: type}
+        self.names = {}  # table -> set of lowercase column names, mysql column names ignore case
+
+        for row in rows:
+            table = row["TABLE_NAME"]
+            self.columns.setdefault(table, []).append({
+                "Field": row["COLUMN_NAME"],
+                "Type": row["COLUMN_TYPE"],
+                "Null": row["IS_NULLABLE"],
+                "Key": row["COLUMN_KEY"],
+                "Default": row["COLUMN_DEFAULT"],
+                "Extra": row["EXTRA"],
+            })
+            self.types.setdefault(table, {})[row["COLUMN_NAME"]] = row["COLUMN_TYPE"]
+            self.names.setdefault(table, set()).add(row["COLUMN_NAME"].lower())
+
+        self.tables = list(self.columns.keys())
+
+
+class PySchemaCache(object):
+
+    def __init__(self, ttl: float = 300, miss_reload: float = 5):
+        """
+        per database cache of tables and columns, a database is loaded with one query
+        on first use and loaded again when older than ttl seconds or on refresh
+
+        Args:
+        * [ttl] seconds a loaded schema stays valid, default is 300, 0 means forever
+        * [miss_reload] an unknown table or column reloads the schema if it is older than
+            this many seconds, default is 5, so new tables are found without hammering the server
+        """
+        self.ttl = float(ttl)
+        self.miss_reload = float(miss_reload)
+        self.lock = threading.Lock()
+        self.schemas = {}  # db -> _Schema
+        self.loading = {}  # db -> lock held while the database is loaded, one query at a time
+
+    def load(self, conn, db):
+        """
+        load the tables and columns of a database from the server
+
+        Args:
+        * [conn] connection of sql
+        * [db] database name
+        """
+        rows = PySQLConnection.query(conn, _COLUMNS_SQL, (db,))
+        if rows is None:
+            rows = []
+        elif isinstance(rows, dict):  # only one row returned
+            rows = [rows]
+
+        schema = _Schema(rows)
+        with self.lock:
+            self.schemas[db] = schema
+        return schema
+
+    def refresh(self, db=None):
+        """
+        forget a database, or all databases, they are loaded again on next use
+        """
+        with self.lock:
+            if db is None:
+                self.schemas.clear()
+            else:
+                self.schemas.pop(db, None)
+
+    def _expired(self, schema):
+        return schema is None or (self.ttl > 0 and time.monotonic() - schema.loaded_at > self.ttl)
+
+    def _reload(self, conn, db, seen):
+        """
+        load a database in place of the schema seen, the threads finding the same
+        schema missing or stale wait for one query and share its result
+        """
+        with self.lock:
+            loading = self.loading.setdefault(db, threading.Lock())
+
+        with loading:
+            schema = self.schemas.get(db)
+            if schema is not seen and not self._expired(schema):  # loaded by another thread meanwhile
+                return schema
+            return self.load(conn, db)
+
+    def schema(self, conn, db):
+        """
+        the cached schema of a database, loaded if missing or expired
+        """
+        schema = self.schemas.get(db)
+        if self._expired(schema):
+            schema = self._reload(conn, db, schema)
+        return schema
+
+    def tables(self, conn, db):
+        """
+        Returns:
+        * [list] names of the tables in database
+        """
+        return list(self.schema(conn, db).tables)
+
+    def columns(self, conn, db, table):
+        """
+        Returns:
+        * [list] columns of table in the form of SHOW COLUMNS, None if the table is unknown
+        """
+        columns = self.schema(conn, db).columns.get(table)
+        return list(columns) if columns is not None else None
+
+    def column_types(self, conn, db, table):
+        """
+        Returns:
+        * [dict] {column: type} of table, None if the table is unknown
+        """
+        types = self.schema(conn, db).types.get(table)
+        return dict(types) if types is not None else None
+
+    def _find(self, conn, db, table, columns):
+        schema = self.schema(conn, db)
+        names = schema.names.get(table)
+        if names is None:
+            return schema, table
+        for column in columns:
+            if column.lower() not in names:
+                return schema, column
+        return schema, None
+
+    def validate(self, conn, db, table, columns=()):
+        """
+        check a table and its columns exist, with set lookups on the cached schema,
+        column names are matched ignoring case as mysql does
+
+        Args:
+        * [conn] connection of sql, used only when the schema must be loaded
+        * [db] database name
+        * [table] table name
+        * [columns] column names
+
+        Raises:
+        * [InvalidParamException] if the table or a column is unknown
+        """
+        schema, missing = self._find(conn, db, table, columns)
+
+        # maybe created after the schema was loaded
+        if missing is not None and time.monotonic() - schema.loaded_at > self.miss_reload:
+            self._reload(conn, db, schema)
+            schema, missing = self._find(conn, db, table, columns)
+
+        if missing is not None:
+            raise Exceptions.InvalidParamException(f"unknown table or column[{missing}] in `{db}`.`{table}`")
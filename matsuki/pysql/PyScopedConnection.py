@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import functools
+import threading
+
+from siki.basics import Exceptions
+
+try:  # flask is optional, without it connections are bound to threads only
+    from flask import g, current_app, has_request_context
+except ImportError:
+    g = None
+
+EXTENSION_KEY = "matsuki.pysql"
+
+_thread_scope = threading.local()
+
+
+class _Binding(object):
+    """
+    a connection bound to a request or thread, with the depth of nested scopes
+    """
+
+    def __init__(self, conn, request_bound):
+        self.conn = conn
+        self.depth = 0
+        self.request_bound = request_bound
+
+
+def _request_managed(pool):
+    """
+    the pool registered a teardown on the current flask app and a request is running
+    """
+    return g is not None and has_request_context() \
+        and id(pool) in current_app.extensions.get(EXTENSION_KEY, ())
+
+
+def _scope(request_bound):
+    """
+    the dict of bindings of the current request or thread
+    """
+    if request_bound:
+        bindings = g.get("_matsuki_pysql_bindings")
+        if bindings is None:
+            bindings = {}
+            g._matsuki_pysql_bindings = bindings
+        return bindings
+
+    bindings = getattr(_thread_scope, "bindings", None)
+    if bindings is None:
+        bindings = {}
+        _thread_scope.bindings = bindings
+    return bindings
+
+
+def current_connection(pool):
+    """
+    the connection bound to the current request or thread
+
+    @Args:
+    * [pool] PySQLPool
+
+    @Returns:
+    * [conn] pymysql.connect, None if no connection is bound
+    """
+    binding = _scope(_request_managed(pool)).get(id(pool))
+    return binding.conn if binding else None
+
+
+def release_connection(pool):
+    """
+    return the connection bound to the current request or thread to the pool,
+    whatever the depth of the scopes
+    """
+    binding = _scope(_request_managed(pool)).pop(id(pool), None)
+    if binding is not None:
+        pool.put_connection(binding.conn)
+
+
+class ScopedConnection(object):
+    """
+    Context manager that checks out one connection per request or thread. Nested
+    scopes reuse the bound connection, the outermost one returns it to the pool.
+    Within a flask request of an app registered by init_app, the connection stays
+    bound until the request teardown, so sequential scopes share it as well.
+    """
+
+    def __init__(self, pool, timeout: float = None):
+        self.pool = pool
+        self.timeout = timeout
+        self.binding = None
+
+    def __enter__(self):
+        request_bound = _request_managed(self.pool)
+        bindings = _scope(request_bound)
+
+        binding = bindings.get(id(self.pool))
+        if binding is None:
+            conn = self.pool.get_connection(self.timeout, raise_error=True)
+
+            binding = _Binding(conn, request_bound)
+            bindings[id(self.pool)] = binding
+
+        binding.depth += 1
+        self.binding = binding
+        return binding.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        binding, self.binding = self.binding, None
+        binding.depth -= 1
+
+        if binding.depth == 0 and not binding.request_bound:
+            _scope(False).pop(id(self.pool), None)
+            self.pool.put_connection(binding.conn)
+
+        return False
+
+
+def with_connection(pool, timeout: float = None):
+    """
+    decorator, run the function inside a connection scope and pass the
+    connection as its first argument, callback(conn, *args, **kwargs)
+
+    @Args:
+    * [pool] PySQLPool
+    * [timeout] seconds to wait for a free connection, default is the pool checkout_timeout
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with ScopedConnection(pool, timeout) as conn:
+                return func(conn, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def init_app(app, pool):
+    """
+    bind connections of the pool to flask requests, the connection is
+    returned to the pool when the request is torn down
+
+    @Args:
+    * [app] flask.Flask
+    * [pool] PySQLPool
+    """
+    if g is None:
+        raise Exceptions.NoAvailableResourcesFoundException("flask is not installed")
+
+    pools = app.extensions.setdefault(EXTENSION_KEY, set())
+    if id(pool) in pools:
+        return
+    pools.add(id(pool))
+
+    @app.teardown_request
+    def _release(exc):
+        binding = g.get("_matsuki_pysql_bindings", {}).pop(id(pool), None)
+        if binding is not None:
+            pool.put_connection(binding.conn)
@@ -17,6 +17,7 @@ setuptools.setup(
     url="https://github.com/seagochen/Matsuki",
     packages=setuptools.find_packages(),
     install_requires=["flask", "siki", "pymysql", "redis"],
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
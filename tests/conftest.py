@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def namespace():
+    """
+    a sqlite server of its own for each test
+    """
+    return uuid.uuid4().hex
+
+
+@pytest.fixture
+def pool_params(tmp_path, namespace):
+    """
+    params of a PySQLPool on the sqlite server of the test, quiet logger, the
+    keyword arguments are added or replace the defaults
+    """
+    def make(**params):
+        defaults = {
+            'bstd': False, 'blog': False, 'dir': str(tmp_path), 'fname': "pool.log",
+            'driver': "sqlite", 'driver_options': {'namespace': namespace},
+        }
+        defaults.update(params)
+        return defaults
+    return make
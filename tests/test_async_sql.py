@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import asyncio
+
+import pytest
+
+from matsuki.pysql import PyAsyncSQL
+from matsuki.pysql.PyAsyncSQL import AsyncPySQLPool
+from matsuki.pysql.PySQLPool import PySQLPool
+from matsuki.pysql.PySQLPool import PySQLPoolException
+
+
+@pytest.fixture
+def pool(pool_params):
+    pool = PySQLPool(1, pool_params(checkout_timeout=1))
+    pool.wait_ready()
+    yield pool
+    pool.close()
+
+
+def test_cancelled_acquire_returns_the_connection(pool):
+    async def main():
+        facade = AsyncPySQLPool(pool, max_workers=2)
+        held = pool.get_connection(raise_error=True)
+
+        # the executor thread waits for the held connection, its caller gives up
+        waiting = asyncio.ensure_future(facade.get_connection(5))
+        await asyncio.sleep(0.1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        pool.put_connection(held)
+        for _ in range(100):
+            if pool.stats()["in_use"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.stats()["in_use"] == 0
+
+        async with facade.acquire(0.5) as conn:
+            assert await conn.query("SELECT 1 AS `one`") == {"one": 1}
+        facade.close()
+
+    asyncio.run(main())
+
+
+def test_acquire_timeout_is_shared(pool):
+    async def main():
+        facade = AsyncPySQLPool(pool)
+        held = pool.get_connection(raise_error=True)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(PySQLPoolException):
+            await facade.get_connection(0.2)
+        assert loop.time() - started < 1
+
+        pool.put_connection(held)
+        async with facade.acquire() as conn:
+            assert await PyAsyncSQL.safe_query_tables(conn, "app") == []
+        facade.close()
+
+    asyncio.run(main())
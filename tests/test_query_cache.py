@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import datetime
+import decimal
+
+import pytest
+
+pytest.importorskip("redis")
+
+from benchmarks.FakeRedisServer import FakeRedisServer
+from matsuki.pyredis.PyRedisPool import PyRedisPool
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql import PySafeSQLCmd
+from matsuki.pysql.PyQueryCache import PyQueryCache
+
+DB, TABLE = "app", "events"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    server = FakeRedisServer().start()
+    redis_pool = PyRedisPool({'host': server.host, 'port': server.port, 'db': 0,
+                              'bstd': False, 'blog': False, 'dir': str(tmp_path), 'fname': "redis.log"})
+    cache = PyQueryCache(redis_pool, ttl=60)
+    PySafeSQLCmd.use_query_cache(cache)
+    yield cache
+    PySafeSQLCmd.use_query_cache(None)
+    server.stop()
+
+
+@pytest.fixture
+def conn(namespace):
+    conn = PySQLConnection.connect(driver="sqlite", namespace=namespace)
+    PySQLConnection.execute(conn, f"CREATE TABLE `{DB}`.`{TABLE}` (`id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY, "
+                                  f"`name` VARCHAR(64))")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def reads():
+    """
+    the SELECT statements sent to the server
+    """
+    sent = []
+
+    def listener(connection, statement, args, seconds, error):
+        if statement.startswith("SELECT"):
+            sent.append(statement)
+
+    PySQLConnection.add_listener(listener)
+    yield sent
+    PySQLConnection.remove_listener(listener)
+
+
+def test_read_through_and_invalidation(cache, conn, reads):
+    PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "a"})
+
+    # the insert seeded the version, the first read fills the entry, then it is served
+    for _ in range(4):
+        assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1)["name"] == "a"
+    assert len(reads) == 1
+
+    # a committed write is seen by the next read
+    PySafeSQLCmd.safe_update(conn, DB, TABLE, 1, {"name": "b"})
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1)["name"] == "b"
+
+    # a write rolled back invalidates nothing, a committed one after the scope
+    with pytest.raises(RuntimeError):
+        with PySafeSQLCmd.transaction(conn):
+            PySafeSQLCmd.safe_update(conn, DB, TABLE, 1, {"name": "c"})
+            raise RuntimeError("rolled back")
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1)["name"] == "b"
+
+    with PySafeSQLCmd.transaction(conn):
+        PySafeSQLCmd.safe_update_many(conn, DB, TABLE, {1: {"name": "d"}})
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1)["name"] == "d"
+
+
+def test_evicted_version_reseeded(cache, conn):
+    PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "a"})
+    for _ in range(2):
+        PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1)
+
+    # the counter is evicted, a write must not bring back the version of the entry
+    cache.redis.remove(cache.version_key(DB, TABLE))
+    PySafeSQLCmd.safe_update(conn, DB, TABLE, 1, {"name": "b"})
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1)["name"] == "b"
+
+
+def test_dates_and_decimals_cached(cache):
+    # the values pymysql returns for DATETIME, DATE, TIME, DECIMAL and BLOB columns
+    row = {"id": 1, "at": datetime.datetime(2026, 10, 18, 12, 30, 15, 250000), "day": datetime.date(2026, 10, 18),
+           "took": datetime.timedelta(hours=1, microseconds=5), "price": decimal.Decimal("9.90"), "raw": b"\x00\xff"}
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return dict(row)
+
+    cache.invalidate(DB, TABLE)
+    rows = [cache.fetch(DB, TABLE, "SELECT * FROM `app`.`events` WHERE `id`=%s", (1,), loader) for _ in range(3)]
+    assert len(loads) == 1
+    assert rows[1] == row and rows[2] == row
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import time
+import uuid
+
+import pytest
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql import PySafeSQLCmd
+from matsuki.pysql.PyRoutingPool import PyRoutingPool
+from matsuki.pysql.PySQLPool import PySQLPool
+
+DB, TABLE = "app", "users"
+
+
+@pytest.fixture
+def pools(pool_params):
+    """
+    a primary and a replica that never catches up, each on a sqlite server of its own
+    """
+    primary = PySQLPool(2, pool_params())
+    replica = PySQLPool(1, pool_params(driver_options={'namespace': uuid.uuid4().hex}))
+    for pool in (primary, replica):
+        with pool.connection() as conn:
+            PySQLConnection.execute(conn, f"CREATE TABLE `{DB}`.`{TABLE}` (`id` INT NOT NULL AUTO_INCREMENT "
+                                          f"PRIMARY KEY, `name` VARCHAR(64))")
+    yield primary, replica
+    primary.close()
+    replica.close()
+
+
+def test_reads_go_to_replica(pools):
+    routing = PyRoutingPool(pools[0], [pools[1]])
+    with routing.session() as session:
+        PySafeSQLCmd.safe_insert(session, DB, TABLE, {"name": "a"})
+        # no read-your-writes window, the replica has not got the row
+        assert PySafeSQLCmd.safe_query_id(session, DB, TABLE, 1) is None
+        assert session.replica is not None and session.replica[0] is pools[1]
+
+        # a transaction scope reads its own writes on the primary
+        with PySafeSQLCmd.transaction(session):
+            PySafeSQLCmd.safe_insert(session, DB, TABLE, {"name": "b"})
+            assert PySafeSQLCmd.safe_query_id(session, DB, TABLE, 2)["name"] == "b"
+
+
+def test_read_your_writes(pools):
+    routing = PyRoutingPool(pools[0], [pools[1]], read_your_writes=0.2)
+    with routing.session() as session:
+        PySafeSQLCmd.safe_insert(session, DB, TABLE, {"name": "a"})
+        assert PySafeSQLCmd.safe_query_id(session, DB, TABLE, 1)["name"] == "a"
+        assert session.replica is None
+
+        # the window is over, back to the replica
+        time.sleep(0.2)
+        assert PySafeSQLCmd.safe_query_id(session, DB, TABLE, 1) is None
+
+
+def test_busy_replica_skipped(pools):
+    primary, replica = pools
+    routing = PyRoutingPool(primary, [replica], replica_timeout=5)
+    with routing.session() as writer:
+        PySafeSQLCmd.safe_insert(writer, DB, TABLE, {"name": "a"})
+
+    held = replica.get_connection(raise_error=True)
+    try:
+        # every replica connection is in use, the primary answers without waiting
+        started = time.monotonic()
+        with routing.session() as session:
+            assert PySafeSQLCmd.safe_query_id(session, DB, TABLE, 1)["name"] == "a"
+        assert time.monotonic() - started < 1
+    finally:
+        replica.put_connection(held)
+    assert replica.stats()["in_use"] == 0 and primary.stats()["in_use"] == 0
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import threading
+
+import pytest
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql import PySafeSQLCmd
+from matsuki.pysql.PySchemaCache import PySchemaCache
+from siki.basics import Exceptions
+
+DB, TABLE = "app", "users"
+
+
+@pytest.fixture
+def conn(namespace):
+    conn = PySQLConnection.connect(driver="sqlite", namespace=namespace)
+    PySQLConnection.execute(conn, f"CREATE TABLE `{DB}`.`{TABLE}` (`id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY, "
+                                  f"`userName` VARCHAR(64))")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def loads():
+    """
+    the schema queries sent to the server
+    """
+    sent = []
+
+    def listener(connection, statement, args, seconds, error):
+        if "information_schema" in statement:
+            sent.append(statement)
+
+    PySQLConnection.add_listener(listener)
+    yield sent
+    PySQLConnection.remove_listener(listener)
+
+
+def test_validate(conn, loads):
+    cache = PySchemaCache(miss_reload=0)
+    cache.validate(conn, DB, TABLE, ("id", "USERNAME", "username"))
+    assert list(cache.column_types(conn, DB, TABLE).keys()) == ["id", "userName"]
+    assert len(loads) == 1
+
+    with pytest.raises(Exceptions.InvalidParamException):
+        cache.validate(conn, DB, TABLE, ("email",))
+
+    # a table created after the load is found by a reload
+    PySQLConnection.execute(conn, f"CREATE TABLE `{DB}`.`orders` (`id` INT PRIMARY KEY)")
+    cache.validate(conn, DB, "orders", ("id",))
+    assert len(loads) == 3
+
+
+def test_loaded_once_by_concurrent_threads(namespace, conn, loads):
+    cache = PySchemaCache()
+    conns = [PySQLConnection.connect(driver="sqlite", namespace=namespace) for _ in range(8)]
+    barrier = threading.Barrier(len(conns))
+    errors = []
+
+    def first_use(other):
+        barrier.wait()
+        try:
+            cache.validate(other, DB, TABLE, ("id",))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=first_use, args=(other,)) for other in conns]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for other in conns:
+        other.close()
+
+    assert errors == []
+    assert len(loads) == 1
+
+
+def test_safe_commands_checked(conn):
+    PySafeSQLCmd.use_schema_cache(PySchemaCache())
+    try:
+        assert PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"username": "a"}) == 1
+        with pytest.raises(Exceptions.InvalidParamException):
+            PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"email": "a"})
+        assert PySafeSQLCmd.safe_query_tables(conn, DB) == [TABLE]
+    finally:
+        PySafeSQLCmd.use_schema_cache(None)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import time
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql.PySQLExplainer import PySQLExplainer
+from matsuki.pysql.PySQLPool import PySQLPool
+from matsuki.pysql.PySQLProfiler import PySQLProfiler
+
+
+def test_explain_is_not_listened(tmp_path, pool_params):
+    quiet = {'bstd': False, 'blog': False, 'dir': str(tmp_path), 'fname': "profiler.log"}
+    pool = PySQLPool(2, pool_params())
+    profiler = PySQLProfiler(dict(quiet, slow_threshold=0))
+    explainer = PySQLExplainer(pool, profiler, quiet)
+
+    heard = []
+
+    def listener(connection, statement, args, seconds, error):
+        heard.append(statement)
+
+    profiler.install()
+    PySQLConnection.add_listener(listener)
+    explainer.start()
+    try:
+        with pool.connection() as conn:
+            PySQLConnection.execute(conn, "CREATE TABLE `app`.`users` (`id` INT PRIMARY KEY, `name` TEXT)")
+            PySQLConnection.query(conn, "SELECT * FROM `app`.`users` WHERE `name`=%s", ("a",))
+
+        for _ in range(200):
+            if explainer.report():
+                break
+            time.sleep(0.01)
+        assert len(explainer.report()) == 1
+    finally:
+        explainer.stop()
+        PySQLConnection.remove_listener(listener)
+        profiler.uninstall()
+        pool.close()
+
+    # the EXPLAIN ran on the explainer thread without the profiler nor other listeners
+    assert not [statement for statement in heard if statement.startswith("EXPLAIN")]
+    assert not [shape for shape in profiler.shapes if shape.startswith("EXPLAIN")]
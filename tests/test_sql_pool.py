@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import time
+
+import pytest
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql import PySQLiteDriver
+from matsuki.pysql.PySQLPool import PySQLPool
+
+
+def _connect_slowly(**options):
+    time.sleep(0.2)
+    return PySQLiteDriver.connect(**options)
+
+
+# a server taking 0.2s to accept a connection
+PySQLConnection.register_driver("slow", _connect_slowly)
+
+# connects of the flaky driver fail while it is down
+_server = {"down": False}
+
+
+def _connect_flaky(**options):
+    if _server["down"]:
+        raise ConnectionRefusedError("server is down")
+    return PySQLiteDriver.connect(**options)
+
+
+PySQLConnection.register_driver("flaky", _connect_flaky)
+
+
+def _wait(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def _kill(conn):
+    """
+    the server drops the connection, the client side still looks open
+    """
+    conn.conn.close()
+
+
+@pytest.fixture
+def pools():
+    opened = []
+    yield opened
+    for pool in opened:
+        pool.close()
+
+
+def test_idle_connection_validated_and_replaced(pool_params, pools):
+    pool = PySQLPool(1, pool_params(validate_idle=0))
+    pools.append(pool)
+
+    conn = pool.get_connection(raise_error=True)
+    pool.put_connection(conn)
+    _kill(conn)
+
+    # idle past validate_idle, pinged without reconnecting in place and replaced in its slot
+    fresh = pool.get_connection(raise_error=True)
+    assert fresh is not conn
+    assert PySQLConnection.query(fresh, "SELECT 1 AS `one`") == {"one": 1}
+    stats = pool.stats()
+    assert (stats["failed_pings"], stats["reconnects"], stats["total"], stats["in_use"]) == (1, 1, 1, 1)
+    pool.put_connection(fresh)
+
+
+def test_recent_connection_not_pinged(pool_params, pools):
+    pool = PySQLPool(1, pool_params(validate_idle=60))
+    pools.append(pool)
+
+    conn = pool.get_connection(raise_error=True)
+    pool.put_connection(conn)
+    _kill(conn)
+
+    # no round trip at checkout, the broken connection is handed out as is
+    assert pool.get_connection(raise_error=True) is conn
+    assert pool.stats()["failed_pings"] == 0
+    pool.put_connection(conn)
+
+
+def test_eager_idle_floor_opened_in_parallel(pool_params, pools):
+    started = time.monotonic()
+    pool = PySQLPool(6, pool_params(driver="slow", min_idle=4, warmup_workers=4))
+    pools.append(pool)
+
+    # 4 connections at once, not 0.8s one after another
+    assert time.monotonic() - started < 0.6
+    assert pool.is_ready()
+    assert pool.stats()["idle"] >= 4
+
+    # the rest up to warmup_size in background
+    assert _wait(lambda: pool.stats()["total"] == 6)
+
+
+def test_lazy_warmup(pool_params, pools):
+    started = time.monotonic()
+    pool = PySQLPool(4, pool_params(driver="slow", warmup="lazy", min_idle=2, warmup_size=3))
+    pools.append(pool)
+
+    assert time.monotonic() - started < 0.1
+    assert not pool.is_ready()
+    assert pool.wait_ready(5)
+    assert pool.stats()["idle"] >= 2
+    assert _wait(lambda: pool.stats()["total"] == 3)
+
+    # a checkout beyond the warmed up connections opens one more
+    held = [pool.get_connection(raise_error=True) for _ in range(4)]
+    assert pool.stats()["total"] == 4
+    for conn in held:
+        pool.put_connection(conn)
+
+
+def test_leaked_connection_reported_and_reclaimed(pool_params, pools):
+    pool = PySQLPool(1, pool_params(leak_threshold=0.05, leak_reclaim=True, checkout_timeout=0.1))
+    pools.append(pool)
+
+    leaked = pool.get_connection(raise_error=True)
+    assert pool.check_leaks() == 0
+    time.sleep(0.1)
+
+    # reported once, closed and its slot given back
+    assert pool.check_leaks() == 1
+    assert pool.check_leaks() == 0
+    stats = pool.stats()
+    assert (stats["leaks"], stats["reclaimed"], stats["in_use"], stats["total"]) == (1, 1, 0, 0)
+    assert not PySQLConnection.is_open(leaked)
+
+    conn = pool.get_connection(raise_error=True)
+    assert conn is not leaked
+
+    # the late return of the leaked connection is ignored
+    pool.put_connection(leaked)
+    assert pool.stats()["in_use"] == 1
+    pool.put_connection(conn)
+
+
+def test_lifetime_and_idle_eviction(pool_params, pools):
+    pool = PySQLPool(3, pool_params(min_idle=1, warmup_size=1, max_lifetime=0.2, lifetime_jitter=0,
+                                    idle_timeout=0.05))
+    pools.append(pool)
+
+    # a spike opens 3 connections, 2 of them idle past idle_timeout are closed
+    held = [pool.get_connection(raise_error=True) for _ in range(3)]
+    for conn in held:
+        pool.put_connection(conn)
+    time.sleep(0.1)
+    assert pool.retire() == 2
+    assert (pool.stats()["evicted"], pool.stats()["total"], pool.stats()["idle"]) == (2, 1, 1)
+
+    # past max_lifetime, closed at checkin or by the pass and replaced
+    conn = pool.get_connection(raise_error=True)
+    time.sleep(0.2)
+    pool.put_connection(conn)
+    assert not PySQLConnection.is_open(conn)
+    assert pool.stats()["expired"] == 1
+    pool.maintain()
+    assert pool.stats()["idle"] == 1
+
+
+def test_background_maintenance(pool_params, pools):
+    pool = PySQLPool(2, pool_params(max_lifetime=0.1, lifetime_jitter=0, maintenance_interval=0.02))
+    pools.append(pool)
+    first = set(pool.pool)
+    pool.start()
+
+    # the expired idle connections are recycled without any checkout
+    assert _wait(lambda: pool.stats()["expired"] >= 2 and pool.stats()["idle"] == 2)
+    assert not first & set(pool.pool)
+
+
+def test_circuit_breaker(pool_params, pools):
+    pool = PySQLPool(2, pool_params(driver="flaky", min_idle=0, warmup_size=0,
+                                    breaker_threshold=2, breaker_reset=0.1))
+    pools.append(pool)
+
+    _server["down"] = True
+    try:
+        assert pool.get_connection() is None
+        assert pool.get_connection() is None
+        assert pool.stats()["breaker_state"] == 1
+
+        # open, fail at once without connecting
+        started = time.monotonic()
+        assert pool.get_connection(5) is None
+        assert time.monotonic() - started < 0.05
+        assert (pool.stats()["rejected"], pool.stats()["connect_failures"]) == (1, 2)
+
+        # the trial fails, open again
+        time.sleep(0.1)
+        assert pool.get_connection() is None
+        assert (pool.stats()["breaker_state"], pool.stats()["connect_failures"]) == (1, 3)
+    finally:
+        _server["down"] = False
+
+    # the trial connects, closed again
+    time.sleep(0.1)
+    conn = pool.get_connection(raise_error=True)
+    assert pool.stats()["breaker_state"] == 0
+    pool.put_connection(conn)
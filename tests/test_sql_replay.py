@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import json
+
+from matsuki.pysql.PySQLCapture import MAGIC
+from matsuki.pysql.PySQLCapture import VERSION
+from matsuki.pysql.PySQLReplay import read_capture
+
+
+def test_read_capture_in_start_order(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    lines = [
+        [MAGIC, VERSION, 0],
+        ["S", 0, "SELECT SLEEP(%s)"],
+        # written as the statements finish, the long one started first
+        [0.2, 0, [0], 0.01, False],
+        [0.1, 0, [1], 0.5, False],
+        [0.3, "UPDATE `app`.`users` SET `name`=%s", ["a"], 0.01, False],
+        # a second capture follows the first one
+        [MAGIC, VERSION, 1],
+        ["S", 0, "SELECT 2"],
+        [0.2, 0, None, 0.01, False],
+        [0.1, 0, None, 0.2, False],
+    ]
+    path.write_text("\n".join([json.dumps(line) for line in lines]) + "\n{\"cut by a crash", encoding="utf8")
+
+    records = list(read_capture(str(path)))
+    assert [round(at, 6) for at, _, _ in records] == [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert [args for _, _, args in records[:3]] == [(1,), (0,), ("a",)]
+    assert [statement for _, statement, _ in records[3:]] == ["SELECT 2", "SELECT 2"]
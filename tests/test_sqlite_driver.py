@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# Author: Orlando Chen
+# Created: Oct 18, 2026
+# Modified: Oct 18, 2026
+
+import threading
+import time
+
+import pytest
+
+from matsuki.pysql import PySQLConnection
+from matsuki.pysql import PySafeSQLCmd
+from matsuki.pysql.PyIdLoader import IdLoader
+from matsuki.pysql.PySQLiteDriver import _translate
+from matsuki.pysql.PySQLPool import PySQLPool
+from matsuki.pysql.PySQLPool import PySQLPoolException
+from siki.basics import Exceptions
+
+DB, TABLE = "app", "users"
+
+
+@pytest.fixture
+def conn(namespace):
+    conn = PySQLConnection.connect(driver="sqlite", namespace=namespace)
+    PySQLConnection.execute(conn, f"CREATE TABLE `{DB}`.`{TABLE}` (`id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY, "
+                                  f"`name` VARCHAR(64), `score` INT) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def other(conn, namespace):
+    """
+    a second connection to the same server
+    """
+    other = PySQLConnection.connect(driver="sqlite", namespace=namespace)
+    yield other
+    other.close()
+
+
+def _names(conn):
+    return [row["name"] for row in PySafeSQLCmd._as_list(
+        PySQLConnection.query(conn, f"SELECT `name` FROM `{DB}`.`{TABLE}` ORDER BY `id`"))]
+
+
+@pytest.mark.parametrize("column", [
+    "`id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY",
+    "`id` BIGINT PRIMARY KEY AUTO_INCREMENT",
+    "`id` INT(11) UNSIGNED NOT NULL AUTO_INCREMENT, PRIMARY KEY (`id`)",
+])
+def test_auto_increment(namespace, column):
+    conn = PySQLConnection.connect(driver="sqlite", namespace=namespace)
+    PySQLConnection.execute(conn, f"CREATE TABLE `{DB}`.`t` ({column}, `name` TEXT)")
+    PySafeSQLCmd.safe_bulk_insert(conn, DB, "t", [{"name": "a"}, {"name": "b"}])
+    assert [row["id"] for row in PySQLConnection.query(conn, f"SELECT `id` FROM `{DB}`.`t`")] == [1, 2]
+
+
+def test_translate():
+    assert _translate("SELECT * FROM `a`.`b` WHERE `x`=%s AND `y` LIKE 'p%%'", True) == \
+        "SELECT * FROM `a`.`b` WHERE `x`=? AND `y` LIKE 'p%'"
+    assert _translate("INSERT INTO `a`.`b` (`id`, `x`) VALUES (%s, %s) ON DUPLICATE KEY UPDATE `x`=VALUES(`x`)",
+                      True) == "INSERT INTO `a`.`b` (`id`, `x`) VALUES (?, ?) ON CONFLICT DO UPDATE SET `x`=excluded.`x`"
+
+
+def test_pool_bounds_and_timeout(pool_params):
+    pool = PySQLPool(2, pool_params(checkout_timeout=0.2))
+    try:
+        first = pool.get_connection(raise_error=True)
+        second = pool.get_connection(raise_error=True)
+        assert pool.stats()["in_use"] == 2
+
+        started = time.monotonic()
+        assert pool.get_connection() is None
+        assert time.monotonic() - started >= 0.2
+        with pytest.raises(PySQLPoolException):
+            pool.get_connection(0.05, raise_error=True)
+
+        # a waiting checkout gets the connection put back
+        threading.Timer(0.05, pool.put_connection, (first,)).start()
+        assert pool.get_connection(1, raise_error=True) is first
+
+        pool.put_connection(first)
+        pool.put_connection(second)
+        assert pool.stats()["in_use"] == 0
+        assert pool.stats()["total"] <= 2
+    finally:
+        pool.close()
+
+
+def test_transaction_commit_and_rollback(conn, other):
+    with PySafeSQLCmd.transaction(conn):
+        PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "a", "score": 1})
+        with PySafeSQLCmd.transaction(conn):  # joins the outer scope
+            PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "b", "score": 2})
+    assert _names(other) == ["a", "b"]
+
+    with pytest.raises(RuntimeError):
+        with PySafeSQLCmd.transaction(conn):
+            PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "c", "score": 3})
+            raise RuntimeError("rolled back")
+    assert _names(conn) == ["a", "b"]
+
+
+def test_no_dirty_reads(conn, other):
+    PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "a", "score": 1})
+
+    with PySafeSQLCmd.transaction(conn):
+        PySafeSQLCmd.safe_update(conn, DB, TABLE, 1, {"name": "b"})
+        assert _names(conn) == ["b"]
+        assert _names(other) == ["a"]
+    assert _names(other) == ["b"]
+
+
+def test_safe_commands(conn):
+    assert PySafeSQLCmd.safe_insert(conn, DB, TABLE, {"name": "a", "score": 1}) == 1
+    assert PySafeSQLCmd.safe_bulk_insert(conn, DB, TABLE, [{"name": f"n{i}", "score": i} for i in range(2, 11)]) == 9
+
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1) == {"id": 1, "name": "a", "score": 1}
+    assert PySafeSQLCmd.safe_query_ids(conn, DB, TABLE, [2, 3, 99], chunk_size=2) == {
+        2: {"id": 2, "name": "n2", "score": 2}, 3: {"id": 3, "name": "n3", "score": 3}}
+    rows = PySafeSQLCmd.safe_simple_query(conn, DB, TABLE, "`id`", "`score`>%s", "`id` DESC", where_args=(8,))
+    assert [row["id"] for row in rows] == [10, 9]
+
+    assert PySafeSQLCmd.safe_update(conn, DB, TABLE, 1, {"name": "z"}) == 1
+    # the same rule as safe_update_many, 0 is kept, only None and empty strings are NULL
+    assert PySafeSQLCmd.safe_update(conn, DB, TABLE, 2, {"name": "", "score": 0}) == 1
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 2) == {"id": 2, "name": None, "score": 0}
+    assert PySafeSQLCmd.safe_delete(conn, DB, TABLE, 10) == 1
+    assert PySafeSQLCmd.safe_query_tables(conn, DB) == [TABLE]
+
+
+def test_query_ids_keyed_by_the_ids_given(conn):
+    PySafeSQLCmd.safe_bulk_insert(conn, DB, TABLE, [{"name": f"n{i}", "score": i} for i in range(1, 4)])
+
+    # ids of a url or json are strings, the id column is an integer
+    found = PySafeSQLCmd.safe_query_ids(conn, DB, TABLE, ["1", 2, "99"])
+    assert set(found.keys()) == {"1", 2}
+    assert found["1"]["name"] == "n1"
+
+    loader = IdLoader(conn, DB, TABLE)
+    assert loader.get("3")["name"] == "n3"
+    assert loader.get_many(["1", "2", "7"]) == {"1": found["1"], "2": found[2]}
+
+
+def test_safe_paged_query(conn):
+    PySafeSQLCmd.safe_bulk_insert(conn, DB, TABLE, [{"name": f"n{i}", "score": i % 3} for i in range(7)])
+
+    pages, cursor = [], None
+    while True:
+        rows, cursor = PySafeSQLCmd.safe_paged_query(conn, DB, TABLE, "`id`", page_size=3, cursor=cursor)
+        pages.append([row["id"] for row in rows])
+        if cursor is None:
+            break
+    assert pages == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_safe_batch_writes(conn):
+    PySafeSQLCmd.safe_bulk_insert(conn, DB, TABLE, [{"name": f"n{i}", "score": i} for i in range(1, 6)])
+
+    # 0 is kept, only None and empty strings are NULL
+    assert PySafeSQLCmd.safe_update_many(conn, DB, TABLE, {1: {"name": "", "score": 0}, 2: {"name": "b", "score": 7}},
+                                         chunk_size=1) == 2
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 1) == {"id": 1, "name": None, "score": 0}
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 2)["score"] == 7
+
+    PySafeSQLCmd.safe_upsert(conn, DB, TABLE, [{"id": 3, "name": "c", "score": 30}, {"id": 6, "name": "f", "score": 6}],
+                             update_keys=["score"])
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 3) == {"id": 3, "name": "n3", "score": 30}
+    assert PySafeSQLCmd.safe_query_id(conn, DB, TABLE, 6) == {"id": 6, "name": "f", "score": 6}
+    with pytest.raises(Exceptions.InvalidParamException):
+        PySafeSQLCmd.safe_upsert(conn, DB, TABLE, [{"id": 3, "score": 1}], update_keys=["name"])
+
+    assert PySafeSQLCmd.safe_delete_many(conn, DB, TABLE, [4, 5, 5, 99]) == 2
+
+    # nothing to do
+    assert PySafeSQLCmd.safe_update_many(conn, DB, TABLE, {}) == 0
+    assert PySafeSQLCmd.safe_upsert(conn, DB, TABLE, []) == 0
+    assert PySafeSQLCmd.safe_delete_many(conn, DB, TABLE, []) == 0
+
+
+def test_statement_builders():
+    assert PySafeSQLCmd._insert_statement(DB, TABLE, ("name", "score")) == \
+        "INSERT INTO `app`.`users` (`name`, `score`) VALUES (%s, %s)"
+    assert PySafeSQLCmd._update_statement(DB, TABLE, ("name",)) == "UPDATE `app`.`users` SET `name`=%s WHERE `id`=%s"
+    assert PySafeSQLCmd._delete_many_statement(DB, TABLE, 2) == "DELETE FROM `app`.`users` WHERE `id` IN (%s, %s)"
+    assert PySafeSQLCmd._upsert_statement(DB, TABLE, ("id", "name"), ("name",), 2) == \
+        "INSERT INTO `app`.`users` (`id`, `name`) VALUES (%s, %s), (%s, %s) ON DUPLICATE KEY UPDATE `name`=VALUES(`name`)"
+
+    # any name the backtick quoting holds is an identifier
+    assert PySafeSQLCmd._delete_many_statement("my-app", "用户", 1) == "DELETE FROM `my-app`.`用户` WHERE `id` IN (%s)"
+    for name in ("name`; DROP TABLE `users", "", "a\x00b"):
+        with pytest.raises(Exceptions.SQLInjectionException):
+            PySafeSQLCmd._insert_statement(DB, TABLE, (name,))
+    with pytest.raises(Exceptions.SQLInjectionException):
+        PySafeSQLCmd._select_statement(DB, (TABLE,), "*", "1=1 UNION SELECT * FROM `secrets`", None)